@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Concurrent batch runner for login_tester.py
+Runs many (username, password, url, site_script) jobs against one shared
+Chromium, each job in its own isolated BrowserContext
+Usage: python batch_runner.py [--profile fast|debug] [--session-cache] [--no-block] [--2fa provider] [--per-origin N] [--rate R] [--retries N] [--report batch.jsonl] [--quiet] <jobs.csv|jobs.jsonl> [concurrency]
+"""
+
+import sys
+import csv
+import json
+import asyncio
+from playwright.async_api import async_playwright
+
+from login_tester import test_login, pop_option, pop_flag
+from profiles import PROFILES, get_profile, launch_options
+from tracing import RunTrace, summarize, write_jsonl, quiet_output
+from rate_limit import DEFAULT_ORIGIN_CONCURRENCY, DEFAULT_ORIGIN_RATE, DEFAULT_RETRIES, RateLimiter, run_scheduled
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BATCH_PROFILE = "fast"
+JOB_FIELDS = ("username", "password", "url", "site_script", "twofa")
+
+def load_jobs(path):
+    """
+    Load jobs from a CSV (with header row) or JSONL file
+    Each job is a dict with username, password and optional url / site_script /
+    twofa (a 2FA provider spec such as "totp:$ACME_TOTP_SECRET")
+    """
+    jobs = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+
+        for line_no, row in enumerate(rows, start=1):
+            if not row.get("username") or row.get("password") is None:
+                raise ValueError(f"{path}: job {line_no} needs username and password")
+            # Empty CSV cells mean "use the default"
+            jobs.append({field: (row.get(field) or None) for field in JOB_FIELDS})
+
+    return jobs
+
+async def run_job(browser, index, job, total, profile, session_cache=False, network_filter=None, twofa=None,
+                  limiter=None, retries=0):
+    """
+    Run job number `index` (0-based, of `total`) on a shared browser
+    With a rate_limit.RateLimiter the job waits for its origin's limits and
+    throttled or transient failures are retried up to `retries` times.
+    Never raises: returns the job's result dict (see run_batch)
+    """
+    print(f"\n▶️  Job {index + 1}/{total}: {job['username']} @ {job['url'] or 'default'}")
+
+    async def attempt():
+        trace = RunTrace(job=index + 1)
+        try:
+            success = await test_login(
+                job["username"], job["password"], job["url"], job["site_script"],
+                browser=browser, profile=profile, session_cache=session_cache, trace=trace,
+                network_filter=network_filter, twofa=job.get("twofa") or twofa,
+            )
+        except Exception as e:
+            success = False
+            trace.finish("error", error=str(e))
+        return success, trace.to_dict()
+
+    if limiter is None:
+        success, report = await attempt()
+    else:
+        success, report, attempts = await run_scheduled(limiter, job["url"], attempt, retries)
+        report["attempts"] = attempts
+
+    return {
+        "job": index + 1,
+        "username": job["username"],
+        "url": job["url"],
+        "site_script": job["site_script"],
+        "success": success,
+        "error": None if success else report.get("error"),
+        "report": report,
+    }
+
+async def run_batch(jobs, concurrency=DEFAULT_CONCURRENCY, profile=DEFAULT_BATCH_PROFILE,
+                    session_cache=False, network_filter=None, twofa=None,
+                    per_origin=DEFAULT_ORIGIN_CONCURRENCY, rate=DEFAULT_ORIGIN_RATE, retries=DEFAULT_RETRIES,
+                    on_result=None):
+    """
+    Run all jobs concurrently on one shared browser
+    At most `concurrency` jobs are in flight at once, and at most
+    `per_origin` of them (started at `rate` per second, None = unlimited)
+    against any one site. Returns one result dict per job, in the same
+    order as `jobs`; each carries the job's timing report
+    (tracing.RunTrace.to_dict) under "report". `twofa` is the 2FA provider
+    for jobs that don't name their own. `on_result(result)` is called as
+    each job finishes, in completion order
+    """
+    # Jobs wait for their origin first and only then for one of the `concurrency` slots
+    limiter = RateLimiter(per_origin, rate, total=concurrency)
+    profile = get_profile(profile)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(**launch_options(profile))
+
+        async def run_limited(index, job):
+            result = await run_job(browser, index, job, len(jobs), profile, session_cache, network_filter, twofa,
+                                   limiter, retries)
+            if on_result:
+                on_result(result)
+            return result
+
+        try:
+            results = await asyncio.gather(*(run_limited(i, job) for i, job in enumerate(jobs)))
+        finally:
+            await browser.close()
+
+    return results
+
+def print_summary(results):
+    """Print a one-line-per-job summary of a batch run"""
+    passed = sum(1 for r in results if r["success"])
+
+    print(f"\n📊 Batch Summary: {passed}/{len(results)} logins succeeded")
+    for r in results:
+        status = "✅" if r["success"] else "❌"
+        line = f"   {status} #{r['job']} {r['username']} @ {r['url'] or 'default'} ({r['report']['duration_ms'] / 1000:.1f}s)"
+        if r["error"]:
+            line += f" ({r['error']})"
+        if r["report"].get("attempts", 1) > 1:
+            line += f" [{r['report']['attempts']} attempts]"
+        print(line)
+
+    summary = summarize([r["report"] for r in results])
+    print(f"   ⏱️  Run time p50 {summary['run']['p50_ms']}ms / p95 {summary['run']['p95_ms']}ms")
+    memory = summary["memory"]
+    if memory["peak_rss_mb"]:
+        line = f"   🧠 Peak memory {memory['peak_rss_mb']} MB (all jobs, browser included)"
+        if memory["js_heap_max_mb"]:
+            line += f", page JS heap p95 {memory['js_heap_p95_mb']} MB / max {memory['js_heap_max_mb']} MB"
+        print(line)
+    if summary["network"]["blocked"]:
+        print(f"   🛡️  Blocked {summary['network']['blocked']} requests "
+              f"(~{summary['network']['bytes_saved_estimate'] // 1024} KB saved)")
+
+def main():
+    """Main function to handle command line arguments"""
+    argv = sys.argv[1:]
+    profile = pop_option(argv, "--profile", DEFAULT_BATCH_PROFILE)
+    session_cache = pop_flag(argv, "--session-cache")
+    report_path = pop_option(argv, "--report")
+    quiet = pop_flag(argv, "--quiet")
+    network_filter = False if pop_flag(argv, "--no-block") else None
+    twofa = pop_option(argv, "--2fa")
+    per_origin = int(pop_option(argv, "--per-origin", DEFAULT_ORIGIN_CONCURRENCY))
+    rate = float(pop_option(argv, "--rate", DEFAULT_ORIGIN_RATE)) or None     # --rate 0: no rate limit
+    retries = int(pop_option(argv, "--retries", DEFAULT_RETRIES))
+    if profile not in PROFILES:
+        print(f"❌ Unknown profile '{profile}' - choose from: {', '.join(PROFILES)}")
+        sys.exit(1)
+
+    if len(argv) < 1:
+        print("Usage: python batch_runner.py [--profile fast|debug] [--session-cache] [--no-block] [--2fa provider] [--per-origin N] [--rate R] [--retries N] [--report batch.jsonl] [--quiet] <jobs.csv|jobs.jsonl> [concurrency]")
+        print("\nCSV columns / JSONL keys: username, password, url, site_script, twofa")
+        sys.exit(1)
+
+    jobs = load_jobs(argv[0])
+    concurrency = int(argv[1]) if len(argv) > 1 else DEFAULT_CONCURRENCY
+
+    def stream_report(result):
+        # One line per job as it finishes, so a long batch can be followed (or acted on) live
+        write_jsonl(report_path, [result["report"]])
+
+    print(f"🚀 Running {len(jobs)} jobs with concurrency {concurrency} ({profile} profile)")
+    with quiet_output(quiet):
+        results = asyncio.run(run_batch(jobs, concurrency, profile, session_cache, network_filter, twofa,
+                                      per_origin, rate, retries, on_result=stream_report if report_path else None))
+    print_summary(results)
+
+    if report_path:
+        write_jsonl(report_path, [summarize([r["report"] for r in results])])
+        print(f"📝 Batch report appended to: {report_path}")
+
+    if not all(r["success"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
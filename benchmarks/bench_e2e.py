@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: real Chromium against the local mock portal
+Runs batches of login (and login + scrape) jobs through batch_runner.run_batch
+at several concurrency levels and reports logins/s, per-login latency
+percentiles, downloads/s and peak RSS of this process tree (driver and
+Chromium included). Each scenario gets its own portal (its own origin, so
+learned selectors don't leak between flows) and one warm-up job that is not
+measured. Runs in a scratch directory: caches and downloads are thrown away.
+Each level starts with an empty downloads/ (and scrape state index), so
+files are downloaded again instead of skipped as unchanged since the warm-up
+
+Usage: python benchmarks/bench_e2e.py [--jobs 8] [--concurrency 1,4,8] [--scenarios one_step,two_step,twofa,error,files]
+                                      [--latency-ms 50] [--files 20] [--page-size 0] [--report bench.jsonl]
+"""
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_runner import run_batch
+from login_tester import pop_option
+from tracing import percentile, process_tree_rss, quiet_output, write_jsonl
+from mock_portal import MockPortal, USERNAME, PASSWORD, TWOFA_SECRET
+
+SCRAPER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "localhost3000_scraper.py")
+
+# name -> (login path, password, site script, 2FA provider, login expected to succeed)
+SCENARIOS = {
+    "one_step": ("/one-step/login", PASSWORD, None, None, True),
+    "two_step": ("/two-step/login", PASSWORD, None, None, True),
+    "twofa": ("/2fa/login", PASSWORD, None, f"totp:{TWOFA_SECRET}", True),
+    "error": ("/one-step/login", "wrong-password", None, None, False),
+    "files": ("/one-step/login", PASSWORD, SCRAPER, None, True),
+}
+
+RSS_SAMPLE_INTERVAL = 0.05
+
+async def run_measured(jobs, concurrency):
+    """run_batch() plus wall time and the peak RSS sampled while it ran"""
+    peak = 0
+    done = asyncio.Event()
+
+    async def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, process_tree_rss() or 0)
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+    sampler = asyncio.create_task(sample())
+    started = time.monotonic()
+    try:
+        # The mock portal is one origin: measure the tool, not the per-origin limits
+        results = await run_batch(jobs, concurrency, per_origin=concurrency, rate=None, retries=0)
+    finally:
+        wall = time.monotonic() - started
+        done.set()
+        await sampler
+    return results, wall, peak
+
+def measure(scenario, results, wall, peak, concurrency, expect_success):
+    """One benchmark record for a scenario at one concurrency level"""
+    reports = [r["report"] for r in results]
+    durations = [r["duration_ms"] for r in reports]
+    downloads = [p for r in reports for p in r["phases"] if p["phase"] == "download"]
+    return {
+        "kind": "e2e_benchmark",
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "jobs": len(results),
+        "as_expected": sum(1 for r in results if r["success"] == expect_success),
+        "wall_s": round(wall, 2),
+        "logins_per_s": round(len(results) / wall, 2),
+        "latency_p50_ms": percentile(durations, 50),
+        "latency_p95_ms": percentile(durations, 95),
+        "latency_max_ms": max(durations),
+        "downloads": len(downloads),
+        "downloads_per_s": round(len(downloads) / wall, 2),
+        "download_mb_per_s": round(sum(p.get("bytes", 0) for p in downloads) / wall / (1024 * 1024), 2),
+        "peak_rss_mb": round(peak / (1024 * 1024), 1) if peak else None,
+    }
+
+async def bench(scenarios, levels, job_count, portal_config):
+    records = []
+    for scenario in scenarios:
+        path, password, site_script, twofa, expect_success = SCENARIOS[scenario]
+        with MockPortal(**portal_config) as portal:
+            job = {"username": USERNAME, "password": password, "url": portal.url(path),
+                   "site_script": site_script, "twofa": twofa}
+            with quiet_output():
+                await run_batch([job], 1)       # warm-up: learns this portal's selectors
+            for concurrency in levels:
+                # The warm-up (or the previous level) indexed every file as saved
+                shutil.rmtree("downloads", ignore_errors=True)
+                with quiet_output():
+                    results, wall, peak = await run_measured([dict(job) for _ in range(job_count)], concurrency)
+                record = measure(scenario, results, wall, peak, concurrency, expect_success)
+                records.append(record)
+                print(f"{scenario:<9} {concurrency:>4} {record['as_expected']:>3}/{record['jobs']:<3} "
+                      f"{record['logins_per_s']:>8.2f} {record['latency_p50_ms']:>8.0f} {record['latency_p95_ms']:>8.0f} "
+                      f"{record['downloads_per_s']:>7.2f} {record['peak_rss_mb'] or 0:>8.0f}")
+    return records
+
+def main():
+    argv = sys.argv[1:]
+    job_count = int(pop_option(argv, "--jobs", 8))
+    levels = [int(n) for n in pop_option(argv, "--concurrency", "1,4,8").split(",")]
+    scenarios = pop_option(argv, "--scenarios", ",".join(SCENARIOS)).split(",")
+    report_path = pop_option(argv, "--report")
+    portal_config = {
+        "latency_ms": int(pop_option(argv, "--latency-ms", 50)),
+        "files": int(pop_option(argv, "--files", 20)),
+        "page_size": int(pop_option(argv, "--page-size", 0)),
+    }
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if argv or unknown:
+        print(__doc__.strip().split("\n\n")[-1])
+        print(f"\nScenarios: {', '.join(SCENARIOS)}")
+        sys.exit(1)
+
+    if report_path:
+        report_path = os.path.abspath(report_path)
+    # Keep the selector/session caches and downloads out of the working tree
+    os.chdir(tempfile.mkdtemp(prefix="bench_e2e_"))
+
+    print(f"📊 End-to-end benchmark ({job_count} jobs per level, {portal_config['latency_ms']}ms portal latency)\n")
+    print(f"{'scenario':<9} {'conc':>4} {'ok':>7} {'logins/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'dl/s':>7} {'peak MB':>8}")
+    records = asyncio.run(bench(scenarios, levels, job_count, portal_config))
+
+    if report_path:
+        write_jsonl(report_path, records)
+        print(f"\n📝 Benchmark records appended to: {report_path}")
+
+if __name__ == "__main__":
+    main()
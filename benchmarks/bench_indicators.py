@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: legacy indicator loops vs the compiled single-pass matcher
+Runs both over the visible text of the saved HTML fixtures in
+benchmarks/fixtures/ (what test_login classifies), so the timings compare
+the matchers alone; text extraction is not timed. The legacy loops stop at
+the first 2FA phrase, the compiled matcher always collects all the evidence
+Usage: python benchmarks/bench_indicators.py [iterations] [padding_blocks]
+
+padding_blocks appends that many copies of dashboard-style filler markup to
+each fixture to simulate a heavy post-login SPA page
+"""
+
+import os
+import sys
+import timeit
+from html.parser import HTMLParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import DEFAULT_INDICATORS, classify
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# (fixture, initial_url, current_url) - URLs as test_login would see them
+CASES = [
+    ("login_error.html",
+     "https://practicetestautomation.com/practice-test-login/",
+     "https://practicetestautomation.com/practice-test-login/"),
+    ("dashboard_success.html",
+     "https://practicetestautomation.com/practice-test-login/",
+     "https://practicetestautomation.com/logged-in-successfully/"),
+    ("twofa_prompt.html",
+     "http://localhost:3000/login",
+     "http://localhost:3000/2fa"),
+]
+
+PADDING_BLOCK = (
+    '<div class="row" data-testid="file-row"><span>Quarterly_Summary.xlsx</span>'
+    '<span>2.4 MB</span><button class="btn-download">Download</button></div>'
+    '<script>window.__STATE__.rows.push({"id": 1, "status": "ok"});</script>\n'
+)
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"}
+
+class VisibleTextParser(HTMLParser):
+    """
+    Rough offline stand-in for document.body.innerText
+    Drops script/style content and anything under an inline display:none
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.stack = []     # (tag, hidden) for every open non-void element
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        style = (dict(attrs).get("style") or "").replace(" ", "")
+        self.stack.append((tag, tag in ("script", "style") or "display:none" in style))
+
+    def handle_endtag(self, tag):
+        # Pop back to the matching open tag (tolerates unclosed children)
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+
+    @property
+    def skip(self):
+        return any(hidden for _, hidden in self.stack)
+
+    def handle_data(self, data):
+        if not self.skip and data.strip():
+            self.parts.append(data.strip())
+
+def visible_text(html):
+    parser = VisibleTextParser()
+    parser.feed(html)
+    return "\n".join(parser.parts)
+
+def legacy_classify(page_content, initial_url, current_url):
+    """The indicator loops test_login used before - page_content.lower() per phrase"""
+    for indicator in DEFAULT_INDICATORS["twofa"]:
+        if indicator.lower() in page_content.lower():
+            return "2fa"
+
+    if current_url != initial_url:
+        for indicator in DEFAULT_INDICATORS["success"]:
+            if indicator.lower() in current_url.lower() or indicator.lower() in page_content.lower():
+                return "success"
+        outcome = "unknown"
+    else:
+        outcome = "unknown"
+        for error in DEFAULT_INDICATORS["error"]:
+            if error.lower() in page_content.lower():
+                outcome = "failure"
+                break
+
+    for failure in DEFAULT_INDICATORS["login_page"]:
+        if failure.lower() in page_content.lower():
+            break
+
+    return outcome
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    padding = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    print(f"📊 Indicator matching benchmark ({iterations} iterations, {padding} padding blocks)\n")
+    print(f"{'fixture':<24} {'html KB':>8} {'text KB':>8} {'legacy':>8} {'compiled':>9} {'speedup':>8}  outcomes")
+
+    for name, initial_url, current_url in CASES:
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            html = f.read()
+        html = html.replace("</body>", PADDING_BLOCK * padding + "</body>")
+        text = visible_text(html)
+
+        legacy_time = timeit.timeit(lambda: legacy_classify(text, initial_url, current_url), number=iterations)
+        compiled_time = timeit.timeit(lambda: classify(text, initial_url, current_url), number=iterations)
+
+        legacy_outcome = legacy_classify(text, initial_url, current_url)
+        compiled_outcome = classify(text, initial_url, current_url)["outcome"]
+
+        print(f"{name:<24} {len(html) / 1024:>8.1f} {len(text) / 1024:>8.1f} "
+              f"{legacy_time / iterations * 1e6:>6.1f}us {compiled_time / iterations * 1e6:>7.1f}us "
+              f"{legacy_time / compiled_time:>7.2f}x  legacy={legacy_outcome} compiled={compiled_outcome}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Local stand-in login portal for offline end-to-end runs
+Serves the flows login_tester.py and localhost3000_scraper.py deal with:
+
+  /one-step/login   username + password on one form
+  /two-step/login   username, Next, then password on a second page
+  /2fa/login        one-step form followed by a verification code page
+                    (TWOFA_CODE or the TOTP code for TWOFA_SECRET)
+  /dashboard        "Open Files" button (any flow ends here on success)
+  /files            paginated files table with Download links
+  /download/<name>  attachment of a fixed size (needs the session cookie)
+
+Wrong credentials re-render the form with an error message. Every response
+is delayed by the configured latency
+
+Usage: python benchmarks/mock_portal.py [--port 3000] [--latency-ms 0] [--files 20] [--page-size 0] [--file-kb 64]
+"""
+
+import os
+import sys
+import html
+import time
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from login_tester import pop_option
+from twofa import totp
+
+USERNAME = "admin"
+PASSWORD = "pass123"
+TWOFA_CODE = "123456"
+TWOFA_SECRET = "JBSWY3DPEHPK3PXP"
+
+# Always listed last, so a scraper has to walk the whole table to find them
+TARGET_FILES = ["Project_Report_2024.pdf", "Meeting_Notes.docx"]
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>{title} - File Portal</title></head>
+<body><main>
+<h1>{title}</h1>
+{body}
+</main></body></html>
+"""
+
+class PortalConfig:
+    """Knobs for one mock portal instance"""
+
+    def __init__(self, latency_ms=0, files=20, page_size=0, file_kb=64):
+        self.latency = latency_ms / 1000
+        self.files = max(files, len(TARGET_FILES))
+        self.page_size = page_size          # 0 = every row on one page
+        self.file_bytes = file_kb * 1024
+
+    def file_names(self):
+        fillers = [f"Archive_{i:04d}.txt" for i in range(self.files - len(TARGET_FILES))]
+        return fillers + TARGET_FILES
+
+class PortalHandler(BaseHTTPRequestHandler):
+    """Request handler; the server carries the config, sessions and counters"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        token = cookie["session"].value if "session" in cookie else None
+        return self.server.sessions.get(token)
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _page(self, title, body, status=200, headers=()):
+        self._send(status, PAGE.format(title=title, body=body).encode("utf-8"), headers=headers)
+
+    def _redirect(self, location, session_state=None):
+        headers = [("Location", location)]
+        if session_state is not None:
+            token = secrets.token_hex(16)
+            self.server.sessions[token] = session_state
+            headers.append(("Set-Cookie", f"session={token}; Path=/; HttpOnly"))
+        self._send(303, headers=headers)
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length", 0))
+        fields = parse_qs(self.rfile.read(length).decode("utf-8"))
+        return {name: values[0] for name, values in fields.items()}
+
+    def _delay(self):
+        if self.server.config.latency:
+            time.sleep(self.server.config.latency)
+
+    def _login_form(self, action, error=None, password=True, username=""):
+        error_html = f'<p class="error" role="alert">{html.escape(error)}</p>' if error else ""
+        if password:
+            fields = (
+                f'<input type="hidden" name="username" value="{html.escape(username)}">' if username else
+                '<label>Username <input type="text" name="username" id="username"></label>'
+            ) + '<label>Password <input type="password" name="password" id="password"></label>' \
+                '<button type="submit">Log in</button>'
+        else:
+            fields = '<label>Username <input type="text" name="username" id="username"></label>' \
+                '<button type="submit">Next</button>'
+        self._page("Sign in", f'{error_html}<form method="post" action="{action}">{fields}</form>')
+
+    def _dashboard(self, session):
+        self._page("Dashboard", (
+            f'<p>Welcome back, {html.escape(session["user"])}!</p>'
+            '<div class="files-card"><button onclick="location.href=\'/files\'">Open Files</button></div>'
+            '<a href="/logout">Logout</a>'
+        ))
+
+    def _files(self, query):
+        config = self.server.config
+        names = config.file_names()
+        page = max(1, int(query.get("page", ["1"])[0]))
+        if config.page_size:
+            start = (page - 1) * config.page_size
+            shown = names[start:start + config.page_size]
+            has_next = start + config.page_size < len(names)
+        else:
+            shown, has_next = names, False
+
+        rows = "".join(
+            f'<tr data-key="{html.escape(name)}"><td>📄 {html.escape(name)}</td>'
+            f'<td>{config.file_bytes // 1024} KB</td>'
+            f'<td><a class="download" href="/download/{quote(name)}">Download</a></td></tr>'
+            for name in shown
+        )
+        pager = f'<a rel="next" href="/files?page={page + 1}">Next</a>' if has_next else ""
+        self._page("Files", (
+            '<table><thead><tr><th>Name</th><th>Size</th><th></th></tr></thead>'
+            f'<tbody>{rows}</tbody></table>{pager}'
+        ))
+
+    def _download(self, name):
+        if name not in self.server.config.file_names():
+            self._send(404, b"not found", "text/plain")
+            return
+        # Deterministic content, so re-downloads dedupe against the manifest
+        seed = name.encode("utf-8") + b"\n"
+        body = (seed * (self.server.config.file_bytes // len(seed) + 1))[:self.server.config.file_bytes]
+        with self.server.lock:
+            self.server.downloads += 1
+        self._send(200, body, "application/octet-stream", headers=[
+            ("Content-Disposition", f'attachment; filename="{name}"'),
+        ])
+
+    def do_GET(self):
+        self._delay()
+        url = urlsplit(self.path)
+        session = self._session()
+
+        if url.path in ("/", "/login", "/one-step/login"):
+            self._login_form("/one-step/login")
+        elif url.path == "/two-step/login":
+            self._login_form("/two-step/password", password=False)
+        elif url.path == "/2fa/login":
+            self._login_form("/2fa/login")
+        elif url.path == "/2fa/verify" and session and session.get("pending_2fa"):
+            self._page("Two-factor verification", (
+                '<p>Enter the 6-digit code from your authenticator app.</p>'
+                '<form method="post" action="/2fa/verify">'
+                '<input type="text" name="code" id="code" inputmode="numeric" autocomplete="one-time-code">'
+                '<button type="submit">Verify</button></form>'
+            ))
+        elif url.path == "/logout":
+            self._redirect("/one-step/login")
+        elif url.path in ("/dashboard", "/files") or url.path.startswith("/download/"):
+            if not session or session.get("pending_2fa"):
+                self._redirect("/one-step/login")
+            elif url.path == "/dashboard":
+                self._dashboard(session)
+            elif url.path == "/files":
+                self._files(parse_qs(url.query))
+            else:
+                self._download(unquote(url.path[len("/download/"):]))
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        self._delay()
+        path = urlsplit(self.path).path
+        form = self._form()
+        with self.server.lock:
+            self.server.logins += path.endswith("/login") or path.endswith("/password")
+
+        valid = form.get("username") == USERNAME and form.get("password") == PASSWORD
+        error = "Invalid username or password. Please try again."
+
+        if path == "/one-step/login":
+            if valid:
+                self._redirect("/dashboard", {"user": USERNAME})
+            else:
+                self._login_form(path, error)
+        elif path == "/two-step/password":
+            if "password" not in form:
+                # Step 1 posted the username - show the password step
+                self._login_form(path, username=form.get("username", ""))
+            elif valid:
+                self._redirect("/dashboard", {"user": USERNAME})
+            else:
+                self._login_form(path, error, username=form.get("username", ""))
+        elif path == "/2fa/login":
+            if valid:
+                self._redirect("/2fa/verify", {"user": USERNAME, "pending_2fa": True})
+            else:
+                self._login_form(path, error)
+        elif path == "/2fa/verify":
+            session = self._session()
+            now = time.time()
+            valid_codes = {TWOFA_CODE, totp(TWOFA_SECRET, now), totp(TWOFA_SECRET, now - 30)}
+            if session and session.get("pending_2fa") and form.get("code") in valid_codes:
+                session["pending_2fa"] = False
+                self._redirect("/dashboard")
+            else:
+                self._page("Two-factor verification", f'<p class="error">{error}</p>', status=200)
+        else:
+            self._send(404, b"not found", "text/plain")
+
+class MockPortal:
+    """
+    Mock portal running on a background thread
+    Use as a context manager; `base_url` is set once it is listening
+    """
+
+    def __init__(self, port=0, **config):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), PortalHandler)
+        self.server.daemon_threads = True
+        self.server.config = PortalConfig(**config)
+        self.server.sessions = {}
+        self.server.lock = threading.Lock()
+        self.server.logins = 0
+        self.server.downloads = 0
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = None
+
+    def url(self, path):
+        return self.base_url + path
+
+    def stats(self):
+        return {"login_posts": self.server.logins, "downloads": self.server.downloads}
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    """Serve the mock portal in the foreground"""
+    argv = sys.argv[1:]
+    port = int(pop_option(argv, "--port", 3000))
+    latency_ms = int(pop_option(argv, "--latency-ms", 0))
+    files = int(pop_option(argv, "--files", 20))
+    page_size = int(pop_option(argv, "--page-size", 0))
+    file_kb = int(pop_option(argv, "--file-kb", 64))
+    if argv:
+        print(__doc__.strip().split("\n\n")[-1])
+        sys.exit(1)
+
+    portal = MockPortal(port, latency_ms=latency_ms, files=files, page_size=page_size, file_kb=file_kb)
+    print(f"🧪 Mock portal on {portal.base_url} (user {USERNAME} / {PASSWORD}, 2FA code {TWOFA_CODE} or TOTP secret {TWOFA_SECRET})")
+    try:
+        portal.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🔚 Mock portal stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Concurrent download pipeline for site scripts
+Clicks download buttons one at a time (so each expect_download() gets its own
+download), lets the transfers run in parallel up to a cap, then streams each
+finished file into downloads/ while computing its SHA-256. A manifest records
+every saved file so unchanged files are not stored twice
+
+Targets that are plain links can skip the browser entirely: with `direct`
+enabled they are fetched over HTTP with the page's cookies, falling back to
+the click path when the server answers with a page that needs JS
+"""
+
+import os
+import re
+import json
+import random
+import time
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import urllib.error
+import urllib.request
+from datetime import datetime
+from email.message import Message
+from urllib.parse import urlsplit, unquote
+
+from tracing import trace_event, emit
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_DOWNLOAD_CONCURRENCY = 4
+CHUNK_SIZE = 1024 * 1024
+
+DIRECT_RETRIES = 3
+DIRECT_BACKOFF = 0.5        # seconds, doubled per retry plus jitter
+DIRECT_TIMEOUT = 60         # seconds per HTTP request
+
+# Files saved before the manifest existed: "20250718_131058_Project_Report_2024.txt"
+TIMESTAMP_PREFIX = re.compile(r"^\d{8}_\d{6}_")
+
+class DownloadManifest:
+    """
+    downloads/manifest.json - one entry per saved file:
+      {"files": {saved_name: {"source_name", "sha256", "size", "downloaded_at"}}}
+    """
+
+    def __init__(self, downloads_dir):
+        self.downloads_dir = downloads_dir
+        self.path = os.path.join(downloads_dir, MANIFEST_NAME)
+        self.files = {}
+        self.load()
+
+    def _read(self):
+        """Entries in the manifest file right now whose file still exists"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                files = json.load(f).get("files", {})
+        except (FileNotFoundError, ValueError):
+            files = {}
+        return {name: entry for name, entry in files.items() if os.path.exists(os.path.join(self.downloads_dir, name))}
+
+    def load(self):
+        # Drop entries whose file was deleted, adopt files saved before the manifest
+        self.files = self._read()
+        for name in sorted(os.listdir(self.downloads_dir)):
+            path = os.path.join(self.downloads_dir, name)
+            # Dotfiles are ours: transfers in progress (.part), the scrape state index
+            if name == MANIFEST_NAME or name in self.files or name.startswith(".") or not os.path.isfile(path):
+                continue
+            sha256, size = hash_file(path)
+            self.add(name, TIMESTAMP_PREFIX.sub("", name), sha256, size)
+
+    def save(self):
+        """
+        Merge our entries into the manifest as it is now (other jobs and shard
+        workers save into the same downloads/) and swap it in through a temp
+        file of our own. A failed write is logged - the files themselves are saved
+        """
+        tmp_path = None
+        try:
+            self.files = dict(self._read(), **self.files)
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.downloads_dir, prefix=f".{MANIFEST_NAME}",
+                                             suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                json.dump({"files": self.files}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not save the download manifest ({self.path}): {e}")
+            if tmp_path:
+                _discard(tmp_path)
+
+    def find(self, source_name, sha256):
+        """Saved name of an existing copy of `source_name` with this checksum, or None"""
+        for name, entry in self.files.items():
+            if entry["sha256"] == sha256 and entry["source_name"] == source_name:
+                return name
+        return None
+
+    def add(self, saved_name, source_name, sha256, size):
+        self.files[saved_name] = {
+            "source_name": source_name,
+            "sha256": sha256,
+            "size": size,
+            "downloaded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+def hash_file(path):
+    """(sha256 hex digest, size) of a file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def _copy_with_checksum(src, dest):
+    """Stream src into dest chunk by chunk, returning (sha256, size)"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(src, "rb") as fin, open(dest, "wb") as fout:
+        for chunk in iter(lambda: fin.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            fout.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def _part_path(downloads_dir):
+    """Unique temporary path in downloads_dir for a transfer in progress"""
+    return os.path.join(downloads_dir, f".{os.getpid()}_{random.getrandbits(48):012x}.part")
+
+def _discard(part_path):
+    """Remove a leftover .part file (a finalized one has already been moved away)"""
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+def _finalize(part_path, source_name, sha256, size, downloads_dir, manifest):
+    """Move a finished .part file into place, or drop it if the manifest already has it"""
+    existing = manifest.find(source_name, sha256)
+    if existing:
+        os.remove(part_path)
+        return {"source_name": source_name, "file": existing, "sha256": sha256, "size": size, "skipped": True}
+
+    # Two downloads of the same name in the same second must not overwrite each other
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    saved_name = f"{timestamp}_{source_name}"
+    counter = 1
+    while os.path.exists(os.path.join(downloads_dir, saved_name)):
+        saved_name = f"{timestamp}_{counter}_{source_name}"
+        counter += 1
+    shutil.move(part_path, os.path.join(downloads_dir, saved_name))
+
+    manifest.add(saved_name, source_name, sha256, size)
+    return {"source_name": source_name, "file": saved_name, "sha256": sha256, "size": size, "skipped": False}
+
+async def store_download(download, downloads_dir, manifest, fallback_name=None):
+    """
+    Wait for a Playwright download to finish and store it in downloads_dir
+    Returns {"source_name", "file", "sha256", "size", "skipped"} - `skipped`
+    is True when an identical copy was already in the manifest
+    """
+    source_name = download.suggested_filename or fallback_name or "download"
+    temp_path = await download.path()
+    part_path = _part_path(downloads_dir)
+
+    # Hashing and copying are blocking file I/O - keep them off the event loop
+    try:
+        sha256, size = await asyncio.to_thread(_copy_with_checksum, temp_path, part_path)
+        return _finalize(part_path, source_name, sha256, size, downloads_dir, manifest)
+    finally:
+        _discard(part_path)
+
+class DirectDownloadError(Exception):
+    """A direct HTTP fetch failed; `retryable` says whether trying again may help"""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+def is_direct_url(href):
+    """True for links a plain HTTP GET can fetch (not javascript:, blob:, data: ...)"""
+    return bool(href) and urlsplit(href).scheme in ("http", "https")
+
+def _filename_from_response(response, url):
+    """Content-Disposition filename, else the last path segment of the URL"""
+    disposition = response.headers.get("Content-Disposition")
+    if disposition:
+        message = Message()
+        message["Content-Disposition"] = disposition
+        filename = message.get_filename()
+        if filename:
+            return os.path.basename(filename)
+    return os.path.basename(unquote(urlsplit(url).path)) or None
+
+def _origin(url):
+    parts = urlsplit(url)
+    return (parts.scheme, parts.netloc.lower())
+
+class _SameOriginRedirects(urllib.request.HTTPRedirectHandler):
+    """Follow redirects, but never carry the page's Cookie header to another origin"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        redirected = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if redirected is not None and _origin(newurl) != _origin(req.full_url):
+            redirected.remove_header("Cookie")
+        return redirected
+
+_opener = urllib.request.build_opener(_SameOriginRedirects)
+
+def _http_fetch(url, headers, part_path):
+    """
+    Blocking GET streamed into part_path while hashing
+    Returns (sha256, size, filename). Runs in a worker thread
+    """
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with _opener.open(request, timeout=DIRECT_TIMEOUT) as response:
+            # An HTML answer to a file link is a login/interstitial page that needs the browser
+            if response.headers.get_content_type() == "text/html":
+                raise DirectDownloadError("server returned an HTML page")
+            filename = _filename_from_response(response, response.geturl())
+
+            digest = hashlib.sha256()
+            size = 0
+            with open(part_path, "wb") as f:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            return digest.hexdigest(), size, filename
+    except urllib.error.HTTPError as e:
+        raise DirectDownloadError(f"HTTP {e.code}", retryable=e.code == 429 or e.code >= 500)
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+        raise DirectDownloadError(str(e), retryable=True)
+
+async def browser_headers(page, url):
+    """Cookie / User-Agent / Referer headers that make a GET look like the page's own request"""
+    cookies = await page.context.cookies(url)
+    headers = {
+        "User-Agent": await page.evaluate("navigator.userAgent"),
+        "Referer": page.url,
+        "Accept": "*/*",
+    }
+    if cookies:
+        headers["Cookie"] = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+    return headers
+
+async def fetch_direct(page, url, downloads_dir, manifest, fallback_name=None, retries=DIRECT_RETRIES):
+    """
+    Download `url` over plain HTTP using the page's authenticated cookies
+    Retries transient failures with jittered exponential backoff. Raises
+    DirectDownloadError when the file needs the browser (or keeps failing)
+    """
+    headers = await browser_headers(page, url)
+    part_path = _part_path(downloads_dir)
+
+    try:
+        for attempt in range(retries + 1):
+            try:
+                sha256, size, filename = await asyncio.to_thread(_http_fetch, url, headers, part_path)
+                break
+            except DirectDownloadError as e:
+                if not e.retryable or attempt == retries:
+                    raise
+                delay = DIRECT_BACKOFF * 2 ** attempt * (1 + random.random())
+                print(f"🔁 {fallback_name or url}: {str(e)} - retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        source_name = filename or fallback_name or "download"
+        return _finalize(part_path, source_name, sha256, size, downloads_dir, manifest)
+    finally:
+        # Failed, cancelled or crashed mid-transfer: no .part file left behind
+        _discard(part_path)
+
+def _report(result, started, method):
+    trace_event("download", time.monotonic() - started, method=method, file=result["file"],
+                bytes=result["size"], skipped=result["skipped"])
+    emit("downloaded", file=result["file"], source_name=result["source_name"], bytes=result["size"],
+         skipped=result["skipped"], method=method)
+    if result["skipped"]:
+        print(f"⏭️  Unchanged, already saved as: {result['file']}")
+    else:
+        print(f"💾 Successfully downloaded: {result['file']} ({result['size']} bytes)")
+    return result
+
+async def download_all(page, targets, downloads_dir, concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, on_started=None,
+                       direct=False, on_result=None):
+    """
+    Download every (name, locator[, href]) in `targets` from `page`
+    Clicks are serialized so each expect_download() resolves to its own file;
+    at most `concurrency` transfers are in flight at once. `on_started` is an
+    optional coroutine run after each click (e.g. a debug pause).
+    With `direct`, targets with a plain http(s) href are fetched over HTTP
+    first and only clicked if that fails.
+    `on_result(position, result)` is called as each target finishes, in
+    completion order (e.g. to checkpoint progress).
+    Returns a result dict per target (see store_download) with an "error" key
+    on failure
+    """
+    os.makedirs(downloads_dir, exist_ok=True)
+    manifest = DownloadManifest(downloads_dir)
+    slots = asyncio.Semaphore(concurrency)
+    click_lock = asyncio.Lock()
+    transfers = []      # a Task per started download, a result dict per failed click
+
+    async def start_click(name, locator):
+        async with click_lock:
+            print(f"🔗 Clicking download for: {name}")
+            async with page.expect_download() as download_info:
+                await locator.click()
+            return await download_info.value
+
+    async def finish(name, download, started):
+        try:
+            return _report(await store_download(download, downloads_dir, manifest, name), started, "click")
+        except Exception as e:
+            print(f"⚠️  Failed to save {name}: {str(e)}")
+            return {"source_name": name, "error": str(e)}
+        finally:
+            slots.release()
+
+    async def fetch(name, locator, href):
+        started = time.monotonic()
+        try:
+            try:
+                print(f"⚡ Fetching directly: {name}")
+                return _report(await fetch_direct(page, href, downloads_dir, manifest, name), started, "direct")
+            except Exception as e:
+                if locator is None:
+                    print(f"⚠️  Direct download failed for {name}: {str(e)}")
+                    return {"source_name": name, "error": str(e)}
+                print(f"↩️  Direct download failed for {name} ({str(e)}) - falling back to click")
+            try:
+                download = await start_click(name, locator)
+                return _report(await store_download(download, downloads_dir, manifest, name), started, "fallback")
+            except Exception as e:
+                print(f"⚠️  Failed to download {name}: {str(e)}")
+                return {"source_name": name, "error": str(e)}
+        finally:
+            slots.release()
+
+    def track(position, transfer):
+        transfers.append(transfer)
+        if on_result is None:
+            return
+        if isinstance(transfer, asyncio.Task):
+            transfer.add_done_callback(lambda t: t.cancelled() or on_result(position, t.result()))
+        else:
+            on_result(position, transfer)
+
+    for position, target in enumerate(targets):
+        name, locator, href = (*target, None)[:3]
+        await slots.acquire()
+
+        if direct and is_direct_url(href):
+            track(position, asyncio.create_task(fetch(name, locator, href)))
+            continue
+
+        started = time.monotonic()
+        try:
+            download = await start_click(name, locator)
+        except Exception as e:
+            slots.release()
+            print(f"⚠️  Failed to start download for {name}: {str(e)}")
+            track(position, {"source_name": name, "error": str(e)})
+            continue
+
+        track(position, asyncio.create_task(finish(name, download, started)))
+        if on_started:
+            await on_started()
+
+    results = [await t if isinstance(t, asyncio.Task) else t for t in transfers]
+    manifest.save()
+    return results
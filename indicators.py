@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Post-login page classification for login_tester.py
+Scans the page's visible text once with a precompiled matcher and returns a
+verdict: "2fa", "success", "failure" or "unknown", plus the matched evidence
+"""
+
+import re
+from functools import lru_cache
+
+from session_cache import url_origin
+from tracing import note_js_heap
+
+DEFAULT_INDICATORS = {
+    # Checked first - a 2FA prompt is handled before success/failure detection
+    "twofa": [
+        '2fa', 'two-factor', 'two factor', 'mfa', 'multi-factor',
+        'authentication', 'authenticator', 'verification', 'verify',
+        'enter code', 'security code', 'verification code', 'auth code',
+        'sms code', 'phone code', 'backup code', 'recovery code',
+        'google authenticator', 'microsoft authenticator',
+    ],
+    # Only trusted when the URL changed after submit
+    "success": [
+        'dashboard', 'welcome', 'logged-in-successfully', 'logout', 'profile',
+        'successfully logged in', 'congratulations', 'secure',
+    ],
+    # Only checked when the URL did not change after submit
+    "error": [
+        'invalid', 'incorrect', 'wrong', 'error', 'failed', 'denied',
+        'bad credentials', 'authentication failed', 'login failed',
+        'username is invalid', 'password is invalid', 'try again',
+    ],
+    # The site is rate limiting us - batch runs back off this origin and retry
+    "throttled": [
+        'too many requests', 'too many attempts', 'too many login attempts', 'rate limit',
+        'try again later', 'temporarily blocked', 'temporarily locked', 'slow down',
+    ],
+    # Informational: signs we are still looking at a login form
+    "login_page": ['sign in', 'log in', 'login', 'enter password', 'authentication'],
+}
+
+# Per-origin overrides, e.g. {"https://x.com": {"success": ["home", "for you"]}}
+SITE_INDICATORS = {}
+
+# Title + rendered text of every element matching `region` (default <body>),
+# cut to `maxChars` in the page so an oversized dashboard never crosses into
+# Python whole. Also reports the page's JS heap (Chromium only) for the run's
+# memory figures
+VISIBLE_TEXT_JS = """
+([region, maxChars]) => {
+    let roots = [];
+    try { roots = region ? Array.from(document.querySelectorAll(region)) : []; } catch (e) {}
+    // A match inside another match would be read twice
+    roots = roots.filter(el => !roots.some(other => other !== el && other.contains(el)));
+    if (!roots.length && document.body) roots = [document.body];
+    let text = document.title + '\\n' + roots.map(el => el.innerText).join('\\n');
+    if (maxChars && text.length > maxChars) text = text.slice(0, maxChars);
+    return [text, performance.memory ? performance.memory.usedJSHeapSize : null];
+}
+"""
+
+def register_site_indicators(url, overrides):
+    """
+    Replace indicator categories for one site (matched by URL origin)
+    Categories not in `overrides` keep their defaults
+    """
+    SITE_INDICATORS[url_origin(url)] = {k: list(v) for k, v in overrides.items()}
+
+def indicators_for_url(url, overrides=None):
+    """
+    Indicator sets for a URL: defaults with any per-site overrides applied,
+    then `overrides` (e.g. test_login's indicators=) - categories it leaves
+    out keep their defaults
+    """
+    indicators = dict(DEFAULT_INDICATORS)
+    indicators.update(SITE_INDICATORS.get(url_origin(url), {}))
+    indicators.update({k: list(v) for k, v in (overrides or {}).items()})
+    return indicators
+
+def _trie_pattern(phrases):
+    """
+    Regex source for a set of phrases, factored as a trie
+    ("log in|login" -> "log(?: in|in)") so the regex engine never retries a
+    shared prefix. Optional tails are greedy, so the longest phrase wins
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+class IndicatorMatcher:
+    """
+    All indicator phrases of all categories compiled into one regex
+    The pattern is a zero-width lookahead around a trie of the phrases, so
+    one finditer() pass reports the longest phrase starting at each offset,
+    overlapping matches included. Any shorter phrase starting at the same
+    offset is necessarily a prefix of it, so those are recovered from a
+    precomputed table instead of a second scan
+    """
+
+    def __init__(self, indicators):
+        self.categories = {}
+        for category, phrases in indicators.items():
+            for phrase in phrases:
+                self.categories.setdefault(phrase.lower(), set()).add(category)
+
+        phrases = sorted(self.categories, key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + _trie_pattern(phrases) + "))")
+        self.prefixes = {
+            phrase: [p for p in phrases if phrase.startswith(p)]
+            for phrase in phrases
+        }
+
+    def scan(self, text):
+        """Return {category: [phrase, ...]} for every phrase found in `text` (already lowercased)"""
+        found = {}
+        seen = set()
+        for match in self.pattern.finditer(text):
+            longest = match.group(1)
+            if longest in seen:
+                continue
+            for phrase in self.prefixes[longest]:
+                if phrase in seen:
+                    continue
+                seen.add(phrase)
+                for category in self.categories[phrase]:
+                    found.setdefault(category, []).append(phrase)
+        return found
+
+@lru_cache(maxsize=64)
+def _compiled(frozen_indicators):
+    return IndicatorMatcher({category: phrases for category, phrases in frozen_indicators})
+
+def get_matcher(indicators):
+    """Compiled matcher for an indicator dict, cached across calls"""
+    return _compiled(tuple(sorted((k, tuple(v)) for k, v in indicators.items())))
+
+async def extract_visible_text(page, max_chars=None, region=None):
+    """
+    Title + rendered text of the page in a single evaluate call (no scripts/hidden markup)
+    `region` is a CSS selector limiting the text to parts of the page (e.g.
+    'form, [role=alert]' reads every form and alert); falls back to the whole
+    body if it matches nothing. At most `max_chars` characters are returned
+    """
+    text, js_heap = await page.evaluate(VISIBLE_TEXT_JS, [region, max_chars])
+    note_js_heap(js_heap)
+    return text
+
+def classify(text, initial_url, current_url, indicators=None, check_twofa=True):
+    """
+    Classify the post-submit page state
+    `text` is the page's visible text. Returns a dict with:
+      outcome   "2fa" | "success" | "failure" | "unknown"
+      evidence  {category: [matched phrases]} for the visible text
+      url_changed, reason
+    """
+    # A partial dict (say only "error") keeps the other categories' defaults
+    indicators = indicators_for_url(current_url, indicators)
+    evidence = get_matcher(indicators).scan(text.lower())
+    url_changed = current_url != initial_url
+
+    if check_twofa and evidence.get("twofa"):
+        outcome = "2fa"
+        reason = f"2FA indicator '{evidence['twofa'][0]}'"
+    elif url_changed:
+        # Success phrases may also show up in the new URL (e.g. /logged-in-successfully)
+        url_hits = get_matcher({"success": indicators["success"]}).scan(current_url.lower())
+        success_hits = evidence.get("success") or url_hits.get("success")
+        if success_hits:
+            evidence["success"] = success_hits
+            outcome = "success"
+            reason = f"URL changed and found success indicator '{success_hits[0]}'"
+        else:
+            outcome = "unknown"
+            reason = "URL changed but no success indicator found"
+    elif evidence.get("error"):
+        outcome = "failure"
+        reason = f"URL unchanged and found error '{evidence['error'][0]}'"
+    else:
+        outcome = "unknown"
+        reason = "URL unchanged and no clear error found"
+
+    return {
+        "outcome": outcome,
+        "evidence": evidence,
+        "url_changed": url_changed,
+        "reason": reason,
+    }
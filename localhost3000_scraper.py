@@ -1,19 +1,31 @@
 #!/usr/bin/env python3
 """
 Site-specific scraper for localhost:3000 React portal
-This script runs after successful authentication via login_tester.py
+This script runs after successful authentication via login_tester.py, as a
+plugin (see plugins.py): its scrape hook works inside the job's
+BrowserContext and leaves closing it to login_tester.py
 """
 
 import asyncio
 import os
-from datetime import datetime
+import time
 
-async def run_scraper(page, browser):
+from profiles import get_profile, pause
+from download_pipeline import download_all, MANIFEST_NAME
+from table_scan import TABLE_ROW_SELECTORS, iter_table_rows, index_targets, match_row
+from tracing import trace_event
+from state_index import StateIndex, row_fingerprint
+
+async def scrape(page, context, profile=None, account=None):
     """
-    Main scraper function - receives authenticated page and browser from login_tester.py
+    Main scraper hook - receives the authenticated page and its BrowserContext from login_tester.py
     Specific for localhost:3000 File Portal Dashboard structure
+    `profile` is the run profile from login_tester.py (debug keeps the visual pauses)
+    `account` is the job's username - each account's files are tracked separately
     """
+    profile = get_profile(profile)
     print("\n🎯 Starting localhost:3000 File Portal scraping...")
+    index = None
     
     try:
         # We should already be on the dashboard after successful 2FA
@@ -21,8 +33,9 @@ async def run_scraper(page, browser):
         print(f"📍 Current location: {current_url}")
         
         # Wait for dashboard to fully load
-        await page.wait_for_load_state('networkidle')
-        await asyncio.sleep(2)
+        if profile['fixed_waits']:
+            await page.wait_for_load_state('networkidle')
+        await pause(profile, 2)
         
         # Create downloads directory if it doesn't exist
         downloads_dir = "downloads"
@@ -30,7 +43,14 @@ async def run_scraper(page, browser):
             os.makedirs(downloads_dir)
             print(f"📁 Created downloads directory: {downloads_dir}")
         
+        # What earlier runs already saved - only new or changed files are downloaded
+        index = StateIndex(downloads_dir, current_url, account)
+        resumed_from = index.start_run()
+        if resumed_from:
+            print(f"⏯️  Resuming the run started {resumed_from} - files it finished are skipped")
+        
         # Step 1: Navigate to Files section
+        step_started = time.monotonic()
         print("\n🔍 Looking for 'Open Files' button on dashboard...")
         
         # Look for the "Open Files" button
@@ -61,9 +81,17 @@ async def run_scraper(page, browser):
             await files_section.click()
         
         # Wait for files page to load
-        await page.wait_for_load_state('networkidle')
-        await asyncio.sleep(3)
+        if profile['fixed_waits']:
+            await page.wait_for_load_state('networkidle')
+            await asyncio.sleep(3)
+        else:
+            # Fast profile: wait for the files table itself to render
+            try:
+                await page.locator(', '.join(TABLE_ROW_SELECTORS)).first.wait_for()
+            except Exception:
+                print("⚠️  Files table did not appear within the step timeout")
         
+        trace_event("scrape:open_files", time.monotonic() - step_started)
         print(f"📍 Navigated to: {page.url}")
         
         # Step 2: Scan the files table
@@ -71,166 +99,139 @@ async def run_scraper(page, browser):
         
         # Target files we want to download
         target_files = ["Project_Report_2024.pdf", "Meeting_Notes.docx"]
-        downloads_found = 0
+        results = []
         
         # Look for table rows containing files
         print("🔍 Looking for file table rows...")
         
-        # Try different table selectors
-        table_selectors = [
-            'table tr',           # Standard table rows
-            '[role="table"] tr',  # ARIA table
-            '.table tr',          # CSS class table
-            'tbody tr',           # Table body rows
-        ]
-        
-        for table_selector in table_selectors:
-            try:
-                rows = await page.locator(table_selector).all()
-                if len(rows) > 1:  # More than header row
-                    print(f"✅ Found table with {len(rows)} rows using: {table_selector}")
-                    
-                    for row in rows:
-                        try:
-                            row_text = await row.text_content()
-                            row_text = row_text.strip() if row_text else ""
-                            
-                            # Check if this row contains one of our target files
-                            for target_file in target_files:
-                                if target_file in row_text:
-                                    print(f"🎯 Found target file in row: {target_file}")
-                                    
-                                    # Look for download button in this row
-                                    download_button = row.locator('button:has-text("Download"), a:has-text("Download"), [class*="download"]').first
-                                    
-                                    if await download_button.count() > 0:
-                                        print(f"🔗 Clicking download for: {target_file}")
-                                        
-                                        # Set up download handling
-                                        async with page.expect_download() as download_info:
-                                            await download_button.click()
-                                        
-                                        # Handle the download
-                                        download = await download_info.value
-                                        filename = download.suggested_filename or target_file
-                                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                                        safe_filename = f"{timestamp}_{filename}"
-                                        
-                                        download_path = os.path.join(downloads_dir, safe_filename)
-                                        await download.save_as(download_path)
-                                        
-                                        print(f"💾 Successfully downloaded: {safe_filename}")
-                                        downloads_found += 1
-                                        
-                                        # Remove from target list so we don't download duplicates
-                                        target_files.remove(target_file)
-                                        
-                                        # Small delay between downloads
-                                        await asyncio.sleep(2)
-                                        break
-                                    else:
-                                        print(f"⚠️  No download button found for: {target_file}")
-                        
-                        except Exception as e:
-                            print(f"⚠️  Error processing row: {str(e)}")
-                            continue
-                    
-                    break  # Found working table selector, no need to try others
+        # Each batch is one evaluate() worth of rows (a table page or a scroll window)
+        wanted, by_length = index_targets(target_files)
+        try:
+            step_started = time.monotonic()
+            async for rows in iter_table_rows(page, page_timeout=profile['step_timeout']):
+                trace_event("scrape:table_batch", time.monotonic() - step_started, rows=len(rows))
+                print(f"✅ Scanned {len(rows)} table rows")
+                
+                targets = []
+                fingerprints = []
+                for row in rows:
+                    target_file = match_row(row, wanted, by_length)
+                    if target_file is None:
+                        continue
+                    print(f"🎯 Found target file in row: {target_file}")
+                    if row['locator'] is None:
+                        print(f"⚠️  No download button found for: {target_file}")
+                        continue
+                    # Only take the first row per file so we don't download duplicates
+                    wanted.discard(target_file)
+                    by_length.remove(target_file)
+                    fingerprint = row_fingerprint(row)
+                    if index.is_unchanged(target_file, fingerprint):
+                        print(f"⏭️  Unchanged since last run, not downloading: {target_file}")
+                        trace_event("scrape:unchanged", 0, file=target_file)
+                        continue
+                    targets.append((target_file, row['locator'], row['href']))
+                    fingerprints.append(fingerprint)
+                
+                if targets:
+                    # Checkpoint each file as it lands so an interrupted run can resume
+                    def checkpoint(position, result):
+                        index.record(targets[position][0], fingerprints[position], result)
                     
-            except Exception as e:
-                print(f"⚠️  Error with table selector '{table_selector}': {str(e)}")
-                continue
+                    results += await download_all(
+                        page, targets, downloads_dir,
+                        concurrency=profile['download_concurrency'],
+                        on_started=lambda: pause(profile, 2),
+                        direct=profile['direct_downloads'],
+                        on_result=checkpoint,
+                    )
+                if not wanted:
+                    break
+                step_started = time.monotonic()
+        except Exception as e:
+            print(f"⚠️  Error scanning files table: {str(e)}")
+        
+        for target_file in wanted:
+            print(f"⚠️  Target file not found in table: {target_file}")
         
         # If we didn't find the files in table, try alternative download methods
-        if downloads_found == 0:
+        if not any('file' in r for r in results) and not index.unchanged:
             print("\n🔍 Table method didn't work, trying alternative download detection...")
             
             # Look for any download buttons on the page
-            download_buttons = await page.locator('button:has-text("Download"), a:has-text("Download")').all()
+            download_buttons = page.locator('button:has-text("Download"), a:has-text("Download")')
+            button_count = await download_buttons.count()
             
-            if download_buttons:
-                print(f"✅ Found {len(download_buttons)} download buttons")
-                
-                for i, button in enumerate(download_buttons):
-                    try:
-                        button_text = await button.text_content()
-                        print(f"🔗 Clicking download button {i+1}: '{button_text}'")
-                        
-                        async with page.expect_download() as download_info:
-                            await button.click()
-                        
-                        download = await download_info.value
-                        filename = download.suggested_filename
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        safe_filename = f"{timestamp}_{filename}"
-                        
-                        download_path = os.path.join(downloads_dir, safe_filename)
-                        await download.save_as(download_path)
-                        
-                        print(f"💾 Downloaded: {safe_filename}")
-                        downloads_found += 1
-                        
-                        await asyncio.sleep(2)
-                        
-                    except Exception as e:
-                        print(f"⚠️  Failed to download from button {i+1}: {str(e)}")
-                        continue
+            if button_count:
+                print(f"✅ Found {button_count} download buttons")
+                targets = [(f"button {i + 1}", download_buttons.nth(i)) for i in range(button_count)]
+                results = await download_all(
+                    page, targets, downloads_dir,
+                    concurrency=profile['download_concurrency'],
+                    on_started=lambda: pause(profile, 2),
+                )
+        
+        downloads_found = sum(1 for r in results if 'file' in r and not r['skipped'])
+        downloads_skipped = sum(1 for r in results if r.get('skipped'))
         
         # Final summary
         print(f"\n📊 Scraping Summary:")
         print(f"   💾 Total downloads: {downloads_found}")
-        print(f"   📁 Saved to: {downloads_dir}/")
+        print(f"   ⏭️  Unchanged (already saved): {downloads_skipped}")
+        if index.unchanged:
+            print(f"   📇 Skipped, listing unchanged since last run: {len(index.unchanged)} ({', '.join(index.unchanged)})")
+        print(f"   📁 Saved to: {downloads_dir}/ (checksums in {MANIFEST_NAME})")
         
-        if downloads_found > 0:
+        index.finish_run()
+        if downloads_found + downloads_skipped + len(index.unchanged) > 0:
             print("🎉 Scraping completed successfully!")
         else:
             print("⚠️  No downloads found - check if the site structure has changed")
         
         # Keep browser open for a few seconds to see results
-        print("\n⏳ Keeping browser open for 10 seconds...")
-        await asyncio.sleep(10)
+        if profile['fixed_waits']:
+            print("\n⏳ Keeping browser open for 10 seconds...")
+            await asyncio.sleep(10)
         
     except Exception as e:
         print(f"❌ Error during scraping: {str(e)}")
         
+    finally:
+        if index is not None:
+            index.close()
+
+async def run_scraper(page, browser, profile=None):
+    """Standalone entry point: scrape, then close `browser` (a Browser or BrowserContext)"""
+    try:
+        await scrape(page, page.context, profile=profile)
     finally:
         print("🔚 Closing browser...")
         await browser.close()
 
-async def scan_page_for_downloads(page, downloads_dir):
+async def scan_page_for_downloads(page, downloads_dir, profile=None):
     """Helper function to scan current page for downloads"""
+    profile = get_profile(profile)
     print(f"🔍 Scanning current page: {page.url}")
-    downloads_count = 0
     
     download_selectors = [
         'a[href*=".pdf"]', 'a[href*=".doc"]', 'a[href*=".xlsx"]',
         'button:has-text("Download")', 'a:has-text("Download")'
     ]
     
+    targets = []
     for selector in download_selectors:
         try:
-            elements = await page.locator(selector).all()
-            for element in elements:
-                try:
-                    async with page.expect_download() as download_info:
-                        await element.click()
-                    
-                    download = await download_info.value
-                    filename = download.suggested_filename
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    safe_filename = f"{timestamp}_{filename}"
-                    
-                    download_path = os.path.join(downloads_dir, safe_filename)
-                    await download.save_as(download_path)
-                    
-                    print(f"💾 Downloaded: {safe_filename}")
-                    downloads_count += 1
-                    await asyncio.sleep(1)
-                    
-                except Exception as e:
-                    continue
-                    
+            elements = page.locator(selector)
+            # One round trip per selector for every element's href (None for buttons)
+            hrefs = await elements.evaluate_all("els => els.map(el => el.href || null)")
+            targets.extend((f"{selector} #{i + 1}", elements.nth(i), href) for i, href in enumerate(hrefs))
         except Exception as e:
             continue
     
-    return downloads_count 
\ No newline at end of file
+    results = await download_all(
+        page, targets, downloads_dir,
+        concurrency=profile['download_concurrency'],
+        on_started=lambda: pause(profile, 1),
+        direct=profile['direct_downloads'],
+    )
+    return sum(1 for r in results if 'file' in r and not r['skipped'])
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Streaming API for login_tester.py
+stream_login() runs one login (+ site script) and yields a LoginEvent as
+each step happens: navigated, filled, submitted, classified, downloaded
+and error. The last event is always "result", carrying a LoginResult.
+Leaving the loop early (e.g. on a "failure" classification) cancels the
+run and closes its browser context
+
+    async for event in stream_login("admin", "pass123", url, profile="fast"):
+        if event.kind == "classified" and event.data["outcome"] == "failure":
+            break
+        if event.kind == "result":
+            print(event.result.success, event.result.downloads)
+
+Usage: python login_stream.py [--profile debug|fast] [--2fa provider] <username> <password> [url] [site_script.py]
+(prints one JSON line per event; progress output is silenced)
+"""
+
+import sys
+import json
+import time
+import asyncio
+
+from login_tester import test_login, pop_option
+from profiles import PROFILES
+from tracing import RunTrace, quiet_output
+
+class LoginEvent:
+    """One step of a running login: `kind`, ms since the run started, and its `data` dict"""
+
+    __slots__ = ("kind", "at_ms", "data", "result")
+
+    def __init__(self, kind, at_ms, data, result=None):
+        self.kind = kind
+        self.at_ms = at_ms
+        self.data = data
+        self.result = result    # the LoginResult, on the final "result" event only
+
+    def to_dict(self):
+        data = self.result.to_dict() if self.result is not None else self.data
+        return {"event": self.kind, "at_ms": self.at_ms, **data}
+
+    def __repr__(self):
+        return f"LoginEvent({self.kind!r}, {self.at_ms}ms, {self.result or self.data!r})"
+
+class LoginResult:
+    """Everything a finished run found out; true when the login succeeded"""
+
+    __slots__ = ("success", "outcome", "username", "url", "final_url", "evidence", "twofa",
+                 "downloads", "error", "duration_ms", "report")
+
+    def __init__(self, success, report, events):
+        self.success = success
+        self.outcome = report["outcome"]
+        self.username = report.get("username")
+        self.url = report.get("url")
+        self.final_url = report.get("final_url")
+        self.evidence = report.get("evidence") or {}
+        self.twofa = any(e.kind == "classified" and e.data["outcome"] == "2fa" for e in events)
+        self.downloads = [e.data["file"] for e in events if e.kind == "downloaded" and not e.data["skipped"]]
+        self.error = report.get("error")
+        self.duration_ms = report["duration_ms"]
+        self.report = report    # the full tracing.RunTrace report
+
+    def __bool__(self):
+        return self.success
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != "report"}
+
+    def __repr__(self):
+        return f"LoginResult({self.outcome}, {self.username} @ {self.final_url or self.url}, {self.duration_ms}ms)"
+
+async def stream_login(username, password, url=None, site_script=None, **options):
+    """
+    Run test_login() (same keyword options) as an async generator of LoginEvents
+    A `trace` option is used for the run's report if given
+    """
+    trace = options.pop("trace", None) or RunTrace()
+    events = asyncio.Queue()
+    seen = []
+
+    def on_event(kind, data):
+        events.put_nowait(LoginEvent(kind, round((time.monotonic() - trace.start) * 1000, 1), data))
+
+    trace.listeners.append(on_event)
+    run = asyncio.create_task(test_login(username, password, url, site_script, trace=trace, **options))
+    run.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while (event := await events.get()) is not None:
+            seen.append(event)
+            yield event
+
+        try:
+            success = run.result()
+        except Exception as e:
+            success = False
+            trace.finish("error", error=str(e))
+        report = trace.to_dict()
+        yield LoginEvent("result", report["duration_ms"], {}, LoginResult(success, report, seen))
+    finally:
+        trace.listeners.remove(on_event)
+        if not run.done():
+            run.cancel()
+            try:
+                await run
+            except asyncio.CancelledError:
+                pass
+
+async def _print_events(out, args, options):
+    success = False
+    async for event in stream_login(*args, **options):
+        out.write(json.dumps(event.to_dict()) + "\n")
+        out.flush()
+        if event.result is not None:
+            success = event.result.success
+    return success
+
+def main():
+    """Main function to handle command line arguments"""
+    argv = sys.argv[1:]
+    profile = pop_option(argv, "--profile", "fast")
+    twofa = pop_option(argv, "--2fa")
+    if profile not in PROFILES:
+        print(f"❌ Unknown profile '{profile}' - choose from: {', '.join(PROFILES)}")
+        sys.exit(1)
+
+    if len(argv) < 2:
+        print(__doc__.strip().split("\n\n")[-1])
+        sys.exit(1)
+
+    out = sys.stdout
+    with quiet_output():
+        success = asyncio.run(_print_events(out, argv[:4], {"profile": profile, "twofa": twofa}))
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
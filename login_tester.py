@@ -1,239 +1,483 @@
 #!/usr/bin/env python3
 """
 Simple login tester using Playwright
-Usage: python login_tester.py <username> <password> [url]
+Usage: python login_tester.py [--profile debug|fast] [--session-cache] [--no-selector-cache] [--no-block] [--2fa provider] [--2fa-timeout s] [--text-region selector] [--report run.jsonl] [--quiet] <username> <password> [url] [site_script.py]
 """
 
 import sys
 import asyncio
 from playwright.async_api import async_playwright
 
-async def test_login(username, password, url=None, site_script=None):
-    """Test login functionality on a website"""
+from profiles import PROFILES, get_profile, launch_options, apply_timeouts, pause
+from session_cache import load_session, save_session, invalidate_session, probe_session
+from indicators import classify, extract_visible_text, indicators_for_url
+from tracing import RunTrace, active_trace, trace_phase, set_outcome, emit, write_jsonl, quiet_output
+from selector_cache import SelectorMemo
+from network_filter import make_filter
+from twofa import DEFAULT_TWOFA_TIMEOUT, make_provider, get_twofa_code
+from plugins import load_plugin
+from rate_limit import watch_throttling
+from submit_race import SubmitRace
+
+# Generic selector lists, used until a site's concrete selectors are learned
+USERNAME_SELECTOR = 'input[name="username"], input[id="username"], input[name="email"], input[id="email"], input[type="email"], input[type="text"]'
+PASSWORD_SELECTOR = 'input[name="password"], input[id="password"], input[type="password"]'
+SUBMIT_SELECTOR = 'button[type="submit"], input[type="submit"], button:has-text("Submit"), button:has-text("Log in"), button:has-text("Login"), button:has-text("Sign in")'
+NEXT_SELECTOR = 'button:has-text("Next"), button:has-text("Continue"), button:has-text("Proceed"), button:has-text("Continue to"), button[data-testid*="next"], button[data-testid*="continue"]'
+TWOFA_SELECTOR = 'input[name*="code"], input[id*="code"], input[type="text"], input[type="number"], input[placeholder*="code"], input[placeholder*="Code"]'
+VERIFY_SELECTOR = 'button:has-text("Verify"), button:has-text("Continue"), button:has-text("Confirm"), button:has-text("Submit"), button[type="submit"]'
+
+async def test_login(username, password, url=None, site_script=None, browser=None, profile=None,
+                     session_cache=False, indicators=None, trace=None, selector_cache=True,
+                     network_filter=None, twofa=None, twofa_timeout=DEFAULT_TWOFA_TIMEOUT, text_region=None):
+    """
+    Test login functionality on a website
+    If a shared browser is passed in, the test runs in its own isolated
+    BrowserContext instead of launching a new Chromium
+    `site_script` is a plugin path or registered name (see plugins.py); its
+    hooks run in the job's BrowserContext, which test_login always closes
+    `profile` is a name from profiles.PROFILES ("debug" or "fast")
+    With `session_cache`, a still-valid saved session skips the login flow
+    and a successful login is saved for next time
+    `indicators` overrides some or all of the phrase sets used to classify
+    the result (the rest come from indicators.indicators_for_url)
+    Pass a tracing.RunTrace as `trace` to collect per-phase timings
+    `selector_cache` reuses (and learns) the concrete field selectors per site
+    `network_filter` blocks images/media/fonts/trackers for the login and the
+    site script: None follows the profile, False/True turns it off/on, a dict
+    overrides network_filter.DEFAULT_BLOCK_RULES
+    `twofa` supplies the 2FA code: a twofa.make_provider() spec ("totp:<secret>",
+    "file:<path>"...), a provider or a callable; default asks on the terminal.
+    A provider with no code after `twofa_timeout` seconds counts as no code
+    `text_region` is a CSS selector for the part of the page whose text is
+    classified (default: the whole body, capped at the profile's max_text_chars)
+    """
+    profile = get_profile(profile)
     
     # Default to the practice test site if no URL provided
     if url is None:
         url = "https://practicetestautomation.com/practice-test-login/"
     
+    # Per-run switches passed down to the login flow
+    options = {
+        "session_cache": session_cache,
+        "indicators": indicators,
+        "selector_cache": selector_cache,
+        "network_filter": make_filter(network_filter, profile),
+        "twofa": make_provider(twofa),
+        "twofa_timeout": twofa_timeout,
+        "text_region": text_region,
+        "plugin": None,
+    }
+    if site_script:
+        try:
+            options['plugin'] = load_plugin(site_script)
+        except Exception as e:
+            print(f"❌ Error loading site script {site_script}: {str(e)}")
+    
+    if trace is None:
+        success = await _test_login(username, password, url, site_script, browser, profile, options)
+    else:
+        trace.fields.update(url=url, username=username, profile=profile['name'], site_script=site_script)
+        with active_trace(trace):
+            success = await _test_login(username, password, url, site_script, browser, profile, options)
+    
+    network = options['network_filter']
+    if network is not None:
+        stats = network.stats()
+        print(f"🛡️  Blocked {stats['blocked']} of {stats['blocked'] + stats['allowed']} requests "
+              f"(~{stats['bytes_saved_estimate'] // 1024} KB saved)")
+        if trace is not None:
+            trace.fields['network'] = stats
+    
+    if trace is not None:
+        trace.finish(trace.outcome or ("success" if success else "error"), success=success)
+    return success
+
+async def _test_login(username, password, url, site_script, browser, profile, options):
+    """test_login() body, run with the trace (if any) active"""
     print(f"🚀 Starting login test for: {url}")
     print(f"👤 Username: {username}")
     print(f"🔒 Password: {'*' * len(password)}")
+    print(f"⚙️  Profile: {profile['name']}")
+    
+    if browser is not None:
+        # Shared browser (batch mode) - isolate cookies/storage per job
+        return await _run_in_browser(browser, username, password, url, profile, options)
     
     async with async_playwright() as p:
-        # Launch browser in visible mode (headless=False)
-        browser = await p.chromium.launch(headless=False, slow_mo=1000)
-        page = await browser.new_page()
-        
+        # debug profile launches in visible mode (headless=False)
+        with trace_phase("launch"):
+            browser = await p.chromium.launch(**launch_options(profile))
         try:
-            # Navigate to login page
-            print(f"\n📖 Navigating to: {url}")
-            await page.goto(url)
-            await page.wait_for_load_state('networkidle')
-            
-            # Find and fill username field
-            print("🔍 Looking for username field...")
-            username_field = page.locator('input[name="username"], input[id="username"], input[name="email"], input[id="email"], input[type="email"], input[type="text"]').first
-            await username_field.fill(username)
-            print(f"✅ Username entered: {username}")
-            
+            return await _run_in_browser(browser, username, password, url, profile, options)
+        finally:
+            await browser.close()
+
+async def _run_in_browser(browser, username, password, url, profile, options):
+    """Resume a cached session or log in, each in a fresh BrowserContext of `browser`"""
+    if options['session_cache'] and await _run_cached_session(browser, username, url, profile, options):
+        return True
+    with trace_phase("new_context"):
+        context = await browser.new_context()
+    watch_throttling(context, url)
+    try:
+        return await _run_login_flow(context, username, password, url, profile, options)
+    finally:
+        await _close_context(context, username, profile, options)
+
+async def _close_context(context, username, profile, options):
+    """Run the plugin's teardown hook (if any), then close the job's context"""
+    if options['plugin'] is not None and 'teardown' in options['plugin']:
+        await _run_hook(options['plugin'], 'teardown', context, profile=profile, account=username)
+    await context.close()
+
+async def _run_cached_session(browser, username, url, profile, options):
+    """
+    Try to resume a saved session instead of logging in
+    Returns True if the session was still valid (and the site script ran),
+    False if the caller should fall back to a full login. Plugin hooks only
+    run once the session is accepted - a rejected probe context is closed
+    without them, so each job's hooks (teardown included) run exactly once
+    """
+    entry = load_session(url, username)
+    if entry is None:
+        return False
+    
+    print("♻️  Found cached session - checking it is still valid...")
+    context = await browser.new_context(storage_state=entry['storage_state'])
+    watch_throttling(context, url)
+    session_valid = False
+    try:
+        if options['network_filter'] is not None:
+            await options['network_filter'].install(context)
+        page = await context.new_page()
+        apply_timeouts(page, profile)
+        with trace_phase("session_probe"):
+            session_valid = await probe_session(page, url, profile, entry.get('landing_url'),
+                                                indicators_for_url(url, options['indicators'])['success'])
+        if not session_valid:
+            print("🚩 Cached session rejected - falling back to full login")
+            invalidate_session(url, username)
+            return False
+        
+        print(f"✅ Cached session valid - skipping login ({page.url})")
+        set_outcome("success", session="cached", final_url=page.url)
+        emit("classified", outcome="success", reason="cached session still valid", url=page.url, evidence={})
+        plugin = options['plugin']
+        if plugin is not None:
+            await _run_hook(plugin, 'pre_login', page, context, profile=profile, account=username)
+            await _run_site_script(page, context, plugin, profile, username)
+        return True
+    finally:
+        if session_valid:
+            await _close_context(context, username, profile, options)
+        else:
+            await context.close()
+
+async def _run_hook(plugin, hook, *args, profile=None, account=None):
+    """Run one plugin hook, timed; a failing hook is reported, not raised"""
+    try:
+        with trace_phase("site_script" if hook == 'scrape' else f"plugin:{hook}", script=plugin.name):
+            return await plugin.call(hook, *args, profile=profile, account=account)
+    except Exception as e:
+        print(f"❌ Error in site script {hook} hook: {str(e)}")
+
+async def _run_site_script(page, context, plugin, profile, username):
+    """Run the plugin's post-login and scrape hooks on the authenticated page"""
+    print(f"\n🚀 Login successful! Running site-specific script: {plugin.name}")
+    await _run_hook(plugin, 'post_login', page, context, profile=profile, account=username)
+    await _run_hook(plugin, 'scrape', page, context, profile=profile, account=username)
+
+def _apply_signal(verdict, signal, detail):
+    """
+    Let a post-submit signal decide a verdict the page text left unknown:
+    a logout link means success; an error message only means failure while
+    the URL has not moved on
+    """
+    if verdict['outcome'] != 'unknown':
+        return verdict
+    if signal == 'success' or (signal == 'failure' and not verdict['url_changed']):
+        verdict['outcome'] = signal
+        verdict['reason'] = f"{signal} signal after submit: {detail}"
+    return verdict
+
+async def _run_login_flow(context, username, password, url, profile, options):
+    """
+    Drive the login flow on a new page of the job's BrowserContext
+    `options` holds the per-run switches built by test_login(). The caller
+    owns (and closes) the context
+    """
+    page = await context.new_page()
+    apply_timeouts(page, profile)
+    if options['network_filter'] is not None:
+        # Route on the context so pages opened by the site script are filtered too
+        await options['network_filter'].install(context)
+    plugin = options['plugin']
+    if plugin is not None:
+        await _run_hook(plugin, 'pre_login', page, context, profile=profile, account=username)
+    login_successful = False
+    memo = SelectorMemo(url, enabled=options['selector_cache'])
+    # A learned selector should match at once - don't spend the full step budget on a stale one
+    cached_timeout = profile['settle_timeout']
+    error_phrases = indicators_for_url(url, options['indicators'])['error']
+    race = SubmitRace(page, profile, error_phrases)
+    
+    try:
+        # Navigate to login page
+        print(f"\n📖 Navigating to: {url}")
+        with trace_phase("navigate"):
+            await page.goto(url, wait_until=profile['wait_until'])
+        emit("navigated", url=page.url)
+        
+        # Find and fill username field
+        print("🔍 Looking for username field...")
+        with trace_phase("find:username", cached='username' in memo.cached):
+            await memo.act(page, 'username', USERNAME_SELECTOR, 'fill', username, cached_timeout=cached_timeout)
+        print(f"✅ Username entered: {username}")
+        emit("filled", field="username")
+        
+        flow = memo.flow
+        if flow is None:
             # Try to find password field first
             print("🔍 Looking for password field...")
-            password_field = page.locator('input[name="password"], input[id="password"], input[type="password"]').first
-            
             try:
                 # Check if password field exists (with short timeout)
-                await password_field.wait_for(timeout=3000)
-                await password_field.fill(password)
-                print("✅ Password entered")
-                
-                # Find and click submit button
-                print("🔍 Looking for submit button...")
-                submit_button = page.locator('button[type="submit"], input[type="submit"], button:has-text("Submit"), button:has-text("Log in"), button:has-text("Login"), button:has-text("Sign in")').first
-                
-                # Store URL before clicking submit
-                initial_url = page.url
-                await submit_button.click()
-                print("✅ Login button clicked")
-                
-            except:
-                # Password field not found - likely a two-step login
-                print("⚠️  Password field not found - checking for two-step login...")
-                
-                # Look for Next/Continue/Proceed buttons
-                print("🔍 Looking for Next/Continue button...")
-                next_button = page.locator('button:has-text("Next"), button:has-text("Continue"), button:has-text("Proceed"), button:has-text("Continue to"), button[data-testid*="next"], button[data-testid*="continue"]').first
-                await next_button.click()
-                print("✅ Next button clicked")
-                
-                # Wait for next page to load
-                await page.wait_for_load_state('networkidle')
-                await asyncio.sleep(2)
-                
-                # Now try to find password field again
-                print("🔍 Looking for password field on step 2...")
-                password_field = page.locator('input[name="password"], input[id="password"], input[type="password"]').first
-                await password_field.fill(password)
-                print("✅ Password entered")
-                
-                # Find and click final submit button
-                print("🔍 Looking for final submit button...")
-                submit_button = page.locator('button[type="submit"], input[type="submit"], button:has-text("Submit"), button:has-text("Log in"), button:has-text("Login"), button:has-text("Sign in")').first
-                
-                # Store URL before clicking submit
-                initial_url = page.url
-                await submit_button.click()
-                print("✅ Final login button clicked")
-            
-            # Wait for navigation/response
-            await page.wait_for_load_state('networkidle')
-            await asyncio.sleep(2)  # Give it a moment
+                with trace_phase("probe:password", timeout_ms=3000):
+                    await page.locator(PASSWORD_SELECTOR).first.wait_for(timeout=3000)
+                flow = 'one_step'
+            except Exception:
+                flow = 'two_step'
+        else:
+            print(f"🧠 Known {flow.replace('_', '-')} login for {memo.origin} - skipping password probe")
+        
+        if flow == 'one_step':
+            with trace_phase("find:password", cached='password' in memo.cached):
+                await memo.act(page, 'password', PASSWORD_SELECTOR, 'fill', password, cached_timeout=cached_timeout)
+            print("✅ Password entered")
+            emit("filled", field="password")
             
-            # Check current state
-            current_url = page.url
-            page_content = await page.content()
+            # Find and click submit button
+            print("🔍 Looking for submit button...")
             
-            print(f"\n📍 Initial URL: {initial_url}")
-            print(f"📍 Current URL: {current_url}")
+            # Store URL (and what the page shows) before clicking submit
+            initial_url = page.url
+            await race.arm()
+            with trace_phase("find:submit", cached='submit' in memo.cached):
+                await memo.act(page, 'submit', SUBMIT_SELECTOR, 'click', cached_timeout=cached_timeout)
+            print("✅ Login button clicked")
+            emit("submitted", url=initial_url, flow=flow)
             
-            # Check for 2FA first (before success/failure detection)
-            print("🔍 Checking for 2FA/MFA requirements...")
-            twofa_indicators = [
-                '2fa', 'two-factor', 'two factor', 'mfa', 'multi-factor',
-                'authentication', 'authenticator', 'verification', 'verify',
-                'enter code', 'security code', 'verification code', 'auth code',
-                'sms code', 'phone code', 'backup code', 'recovery code',
-                'google authenticator', 'microsoft authenticator'
-            ]
+        else:
+            # Password field not found - likely a two-step login
+            print("⚠️  Password field not found - checking for two-step login...")
             
-            twofa_detected = False
-            for indicator in twofa_indicators:
-                if indicator.lower() in page_content.lower():
-                    twofa_detected = True
-                    print(f"🔐 2FA DETECTED! Found indicator: '{indicator}'")
-                    break
+            # Look for Next/Continue/Proceed buttons
+            print("🔍 Looking for Next/Continue button...")
+            with trace_phase("find:next", cached='next' in memo.cached):
+                await memo.act(page, 'next', NEXT_SELECTOR, 'click', cached_timeout=cached_timeout)
+            print("✅ Next button clicked")
             
-            if twofa_detected:
-                # Handle 2FA flow
-                print("\n🔐 Two-Factor Authentication Required!")
-                print("📱 Please check your phone/authenticator app for the code")
-                
-                # Prompt user for 2FA code
-                twofa_code = input("\n🔢 Enter your 2FA code: ").strip()
-                
-                if twofa_code:
-                    print(f"✅ 2FA code entered: {twofa_code}")
-                    
-                    # Find 2FA input field
-                    print("🔍 Looking for 2FA code input field...")
-                    twofa_field = page.locator('input[name*="code"], input[id*="code"], input[type="text"], input[type="number"], input[placeholder*="code"], input[placeholder*="Code"]').first
-                    await twofa_field.fill(twofa_code)
-                    print("✅ 2FA code filled")
-                    
-                    # Find and click verify/continue button
-                    print("🔍 Looking for verify/continue button...")
-                    verify_button = page.locator('button:has-text("Verify"), button:has-text("Continue"), button:has-text("Confirm"), button:has-text("Submit"), button[type="submit"]').first
-                    await verify_button.click()
-                    print("✅ Verify button clicked")
-                    
-                    # Wait for 2FA verification
+            # Wait for next page to load (fast profile: fill() below waits for the field itself)
+            with trace_phase("settle:next"):
+                if profile['fixed_waits']:
                     await page.wait_for_load_state('networkidle')
-                    await asyncio.sleep(3)
-                    
-                    # Update current state after 2FA
-                    current_url = page.url
-                    page_content = await page.content()
-                    print(f"📍 URL after 2FA: {current_url}")
-                else:
-                    print("❌ No 2FA code provided - continuing with regular detection")
+                await pause(profile, 2)
             
-            login_successful = False
+            # Now try to find password field again
+            print("🔍 Looking for password field on step 2...")
+            with trace_phase("find:password", step=2, cached='password' in memo.cached):
+                await memo.act(page, 'password', PASSWORD_SELECTOR, 'fill', password, cached_timeout=cached_timeout)
+            print("✅ Password entered")
+            emit("filled", field="password")
             
-            # First check: Did the URL change? (Good sign)
-            if current_url != initial_url:
-                print("✅ URL changed - potential success!")
-                
-                # Check for success indicators
-                success_indicators = [
-                    'dashboard', 'welcome', 'logged-in-successfully', 'logout', 'profile',
-                    'successfully logged in', 'congratulations', 'secure'
-                ]
+            # Find and click final submit button
+            print("🔍 Looking for final submit button...")
+            
+            # Store URL (and what the page shows) before clicking submit
+            initial_url = page.url
+            await race.arm()
+            with trace_phase("find:submit", step=2, cached='submit' in memo.cached):
+                await memo.act(page, 'submit', SUBMIT_SELECTOR, 'click', cached_timeout=cached_timeout)
+            print("✅ Final login button clicked")
+            emit("submitted", url=initial_url, flow=flow)
+        
+        # The form worked - remember how to fill it next time
+        memo.save(flow)
+        
+        # Wait for the first sign of how it went: URL change, error, 2FA input or logout link
+        with trace_phase("settle:submit") as attrs:
+            signal, detail = await race.wait()
+            attrs['signal'] = signal
+            if signal:
+                print(f"⚡ Post-submit signal: {signal} ({detail})")
+            await pause(profile, 2)  # Give it a moment
+        
+        # Check current state
+        current_url = page.url
+        with trace_phase("extract_text") as attrs:
+            page_text = await extract_visible_text(page, profile['max_text_chars'], options['text_region'])
+            attrs['chars'] = len(page_text)
+        
+        print(f"\n📍 Initial URL: {initial_url}")
+        print(f"📍 Current URL: {current_url}")
+        
+        # Check for 2FA first (before success/failure detection)
+        print("🔍 Checking for 2FA/MFA requirements...")
+        with trace_phase("classify"):
+            verdict = _apply_signal(classify(page_text, initial_url, current_url, options['indicators']), signal, detail)
+        
+        emit("classified", outcome=verdict['outcome'], reason=verdict['reason'], url=current_url,
+             evidence=verdict['evidence'])
+        
+        if verdict['outcome'] == '2fa':
+            print(f"🔐 2FA DETECTED! Found indicator: '{verdict['evidence']['twofa'][0]}'")
+            
+            # Handle 2FA flow
+            print("\n🔐 Two-Factor Authentication Required!")
+            
+            # Ask the 2FA provider for the code without blocking the event loop
+            with trace_phase("twofa:code", provider=type(options['twofa']).__name__):
+                twofa_code = await get_twofa_code(options['twofa'], username, url, options['twofa_timeout'])
+            
+            if twofa_code:
+                print(f"✅ 2FA code entered: {twofa_code}")
                 
-                for indicator in success_indicators:
-                    if indicator.lower() in current_url.lower() or indicator.lower() in page_content.lower():
-                        login_successful = True
-                        print(f"✅ SUCCESS! Found success indicator: '{indicator}'")
-                        break
-                        
-            else:
-                # URL didn't change - RED FLAG! Check for errors
-                print("🚩 URL didn't change - checking for error messages...")
+                # Find 2FA input field
+                print("🔍 Looking for 2FA code input field...")
+                with trace_phase("find:twofa", cached='twofa' in memo.cached):
+                    await memo.act(page, 'twofa', TWOFA_SELECTOR, 'fill', twofa_code, cached_timeout=cached_timeout)
+                print("✅ 2FA code filled")
+                emit("filled", field="twofa")
                 
-                # Look for error messages
-                error_indicators = [
-                    'invalid', 'incorrect', 'wrong', 'error', 'failed', 'denied',
-                    'bad credentials', 'authentication failed', 'login failed',
-                    'username is invalid', 'password is invalid', 'try again'
-                ]
+                # Find and click verify/continue button
+                print("🔍 Looking for verify/continue button...")
                 
-                error_found = False
-                for error in error_indicators:
-                    if error.lower() in page_content.lower():
-                        print(f"❌ LOGIN FAILED! Found error: '{error}'")
-                        error_found = True
-                        break
+                # Wait for 2FA verification
+                twofa_url = page.url
+                race = SubmitRace(page, profile, error_phrases, twofa=False)
+                await race.arm()
+                with trace_phase("find:verify", cached='verify' in memo.cached):
+                    await memo.act(page, 'verify', VERIFY_SELECTOR, 'click', cached_timeout=cached_timeout)
+                print("✅ Verify button clicked")
+                emit("submitted", url=twofa_url, flow="twofa")
+                memo.save()
+                with trace_phase("settle:twofa") as attrs:
+                    signal, detail = await race.wait()
+                    attrs['signal'] = signal
+                    await pause(profile, 3)
                 
-                if not error_found:
-                    print("⚠️  URL didn't change but no clear error found - likely failed")
-            
-            # Final fallback check for obvious failures
-            if not login_successful:
-                obvious_failures = ['sign in', 'log in', 'login', 'enter password', 'authentication']
-                for failure in obvious_failures:
-                    if failure.lower() in page_content.lower():
-                        print(f"❌ Still on login page - found: '{failure}'")
-                        break
-            
-            # Check if we need to run a site-specific script
-            if site_script and login_successful:
-                print(f"\n🚀 Login successful! Running site-specific script: {site_script}")
-                try:
-                    # Import and run the site script
-                    import importlib.util
-                    import sys
-                    
-                    spec = importlib.util.spec_from_file_location("site_scraper", site_script)
-                    site_module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(site_module)
-                    
-                    # Run the site scraper with authenticated page and browser
-                    if hasattr(site_module, 'run_scraper'):
-                        await site_module.run_scraper(page, browser)
-                    else:
-                        print("❌ Site script must have a 'run_scraper(page, browser)' function")
-                        
-                except Exception as e:
-                    print(f"❌ Error running site script: {str(e)}")
+                # Update current state after 2FA
+                current_url = page.url
+                with trace_phase("extract_text", step="twofa") as attrs:
+                    page_text = await extract_visible_text(page, profile['max_text_chars'], options['text_region'])
+                    attrs['chars'] = len(page_text)
+                print(f"📍 URL after 2FA: {current_url}")
             else:
-                # Keep browser open for a few seconds to see the result (normal mode)
-                print("\n⏳ Keeping browser open for 5 seconds...")
-                await asyncio.sleep(5)
-            
-        except Exception as e:
-            print(f"❌ Error during login test: {str(e)}")
-            
-        finally:
-            if not site_script or not login_successful:
-                await browser.close()
-            # Note: If site_script is running, it's responsible for closing the browser
+                print("❌ No 2FA code provided - continuing with regular detection")
             
+            verdict = classify(page_text, initial_url, current_url, options['indicators'], check_twofa=False)
+            verdict = _apply_signal(verdict, signal, detail)
+            emit("classified", outcome=verdict['outcome'], reason=verdict['reason'], url=current_url,
+                 evidence=verdict['evidence'])
+        
+        login_successful = verdict['outcome'] == 'success'
+        set_outcome(verdict['outcome'], final_url=current_url, evidence=verdict['evidence'])
+        
+        if verdict['url_changed']:
+            print("✅ URL changed - potential success!")
+        else:
+            print("🚩 URL didn't change - checking for error messages...")
+        
+        if verdict['outcome'] == 'success':
+            print(f"✅ SUCCESS! Found success indicator: '{verdict['evidence']['success'][0]}'")
+        elif verdict['outcome'] == 'failure':
+            print(f"❌ LOGIN FAILED! Found error: '{verdict['evidence']['error'][0]}'")
+        elif not verdict['url_changed']:
+            print("⚠️  URL didn't change but no clear error found - likely failed")
+        
+        # Final fallback check for obvious failures
+        if not login_successful and verdict['evidence'].get('login_page'):
+            print(f"❌ Still on login page - found: '{verdict['evidence']['login_page'][0]}'")
+        
+        # Save the authenticated state before the site script changes it
+        if options['session_cache'] and login_successful:
+            with trace_phase("session_save"):
+                await save_session(context, url, username, landing_url=current_url)
+        
+        # Check if we need to run a site-specific script
+        if plugin is not None and login_successful:
+            await _run_site_script(page, context, plugin, profile, username)
+        elif profile['fixed_waits']:
+            # Keep browser open for a few seconds to see the result (debug mode)
+            print("\n⏳ Keeping browser open for 5 seconds...")
+            await asyncio.sleep(5)
+        
+    except Exception as e:
+        print(f"❌ Error during login test: {str(e)}")
+        set_outcome("error", error=str(e))
+        emit("error", error=str(e), url=page.url)
+        if memo.from_cache:
+            # The remembered flow may be what broke (e.g. site switched to two-step)
+            memo.invalidate()
+        
     return login_successful
 
+def pop_option(argv, flag, default=None):
+    """Remove `flag value` from argv (in place) and return value"""
+    if flag not in argv:
+        return default
+    index = argv.index(flag)
+    if index + 1 >= len(argv):
+        print(f"❌ {flag} needs a value")
+        sys.exit(1)
+    value = argv[index + 1]
+    del argv[index:index + 2]
+    return value
+
+def pop_flag(argv, flag):
+    """Remove a boolean `flag` from argv (in place) and return whether it was there"""
+    if flag not in argv:
+        return False
+    argv.remove(flag)
+    return True
+
 def main():
     """Main function to handle command line arguments"""
+    argv = sys.argv[1:]
+    profile = pop_option(argv, '--profile', 'debug')
+    session_cache = pop_flag(argv, '--session-cache')
+    selector_cache = not pop_flag(argv, '--no-selector-cache')
+    network_filter = False if pop_flag(argv, '--no-block') else None
+    report_path = pop_option(argv, '--report')
+    quiet = pop_flag(argv, '--quiet')
+    twofa = pop_option(argv, '--2fa')
+    twofa_timeout = float(pop_option(argv, '--2fa-timeout', DEFAULT_TWOFA_TIMEOUT))
+    text_region = pop_option(argv, '--text-region')
+    try:
+        make_provider(twofa)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if profile not in PROFILES:
+        print(f"❌ Unknown profile '{profile}' - choose from: {', '.join(PROFILES)}")
+        sys.exit(1)
+    sys.argv[1:] = argv
+    
     if len(sys.argv) < 3:
-        print("Usage: python login_tester.py <username> <password> [url] [site_script.py]")
+        print("Usage: python login_tester.py [--profile debug|fast] [--session-cache] [--no-selector-cache] [--no-block] [--2fa provider] [--2fa-timeout s] [--text-region selector] [--report run.jsonl] [--quiet] <username> <password> [url] [site_script.py]")
+        print("\nProfiles:")
+        print("  debug  visible browser with slow_mo and pauses (default)")
+        print("  fast   headless, no slow_mo, event-driven waits only")
+        print("\n--session-cache reuses a saved login for the same site + username")
+        print("--no-selector-cache ignores the learned per-site field selectors (selector_cache.py)")
+        print("--no-block keeps images/media/fonts/trackers that the fast profile blocks")
+        print("--2fa takes the 2FA code from prompt (default), totp:<base32 secret or $ENV_VAR>, file:<path> or none")
+        print("--text-region limits result detection to one part of the page, e.g. 'form, [role=alert]'")
+        print("--report appends a JSON line with per-phase timings; --quiet hides progress output")
         print("\nExamples:")
         print("  python login_tester.py student Password123")
+        print("  python login_tester.py --profile fast student Password123")
         print("  python login_tester.py myuser mypass https://example.com/login")
         print("  python login_tester.py admin pass123 http://localhost:3000 localhost3000_scraper.py")
         sys.exit(1)
@@ -253,7 +497,16 @@ def main():
         site_script = sys.argv[4] if sys.argv[4].endswith('.py') else None
     
     # Run the async login test
-    success = asyncio.run(test_login(username, password, url, site_script))
+    trace = RunTrace() if report_path else None
+    with quiet_output(quiet):
+        success = asyncio.run(test_login(username, password, url, site_script, profile=profile,
+                                          session_cache=session_cache, trace=trace,
+                                          selector_cache=selector_cache, network_filter=network_filter,
+                                          twofa=twofa, twofa_timeout=twofa_timeout, text_region=text_region))
+    
+    if trace is not None:
+        write_jsonl(report_path, [trace.to_dict()])
+        print(f"📝 Run report appended to: {report_path}")
     
     if success:
         if site_script:
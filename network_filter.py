@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Request blocking for login and scrape navigations
+Routes every request of a BrowserContext through allow/deny rules by
+resource type and host, aborting images, media, fonts and known trackers so
+page loads (and networkidle) don't wait on them. Counts what was blocked
+"""
+
+from urllib.parse import urlsplit
+
+DEFAULT_BLOCK_RULES = {
+    "block_types": ["image", "media", "font"],
+    "deny_hosts": [
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+        "googlesyndication.com", "googleadservices.com", "facebook.net",
+        "connect.facebook.net", "hotjar.com", "segment.io", "segment.com",
+        "mixpanel.com", "amplitude.com", "fullstory.com", "clarity.ms",
+        "newrelic.com", "nr-data.net", "sentry.io", "ads-twitter.com",
+        "analytics.twitter.com", "scorecardresearch.com", "quantserve.com",
+    ],
+    # Hosts that are never blocked, whatever their resource type
+    "allow_hosts": [],
+}
+
+# Typical transfer sizes used to estimate bytes saved - a blocked request
+# never reports its real size
+ESTIMATED_BYTES = {
+    "image": 40 * 1024,
+    "media": 500 * 1024,
+    "font": 35 * 1024,
+    "script": 30 * 1024,
+    "stylesheet": 15 * 1024,
+}
+DEFAULT_ESTIMATED_BYTES = 5 * 1024
+
+def _host_matches(host, domains):
+    """True if host is one of `domains` or a subdomain of one"""
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+class NetworkFilter:
+    """Allow/deny rules plus counters of what they blocked"""
+
+    def __init__(self, rules=None):
+        rules = dict(DEFAULT_BLOCK_RULES, **(rules or {}))
+        self.block_types = set(rules["block_types"])
+        self.deny_hosts = list(rules["deny_hosts"])
+        self.allow_hosts = list(rules["allow_hosts"])
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_reason = {}
+        self.bytes_saved_estimate = 0
+
+    def should_block(self, resource_type, url):
+        """Reason to block a request ("type:image", "host:..."), or None to let it through"""
+        if resource_type == "document":
+            return None
+        host = (urlsplit(url).hostname or "").lower()
+        if _host_matches(host, self.allow_hosts):
+            return None
+        if resource_type in self.block_types:
+            return f"type:{resource_type}"
+        if _host_matches(host, self.deny_hosts):
+            return "tracker"
+        return None
+
+    async def _handle(self, route):
+        request = route.request
+        reason = self.should_block(request.resource_type, request.url)
+        if reason is None:
+            self.allowed += 1
+            await route.fallback()
+            return
+
+        self.blocked += 1
+        self.blocked_by_reason[reason] = self.blocked_by_reason.get(reason, 0) + 1
+        self.bytes_saved_estimate += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+        await route.abort("blockedbyclient")
+
+    async def install(self, context):
+        """Start filtering every request of a BrowserContext (covers all its pages)"""
+        await context.route("**/*", self._handle)
+
+    def stats(self):
+        return {
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "blocked_by_reason": dict(self.blocked_by_reason),
+            "bytes_saved_estimate": self.bytes_saved_estimate,
+        }
+
+def make_filter(setting, profile):
+    """
+    NetworkFilter for a run, or None for no filtering
+    `setting` is None (follow the profile's block_resources), False (off),
+    True (default rules) or a rules dict overriding DEFAULT_BLOCK_RULES keys
+    """
+    if setting is None:
+        setting = profile["block_resources"]
+    if setting is False:
+        return None
+    return NetworkFilter(setting if isinstance(setting, dict) else None)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Site-script plugins for login_tester.py
+A site script is a module defining any of these async hooks:
+
+  pre_login(page, context)    before the login page is opened (headers, routes, cookies...),
+                              or once a cached session is accepted
+  post_login(page, context)   right after a successful login (or a resumed session)
+  scrape(page, context)       the site-specific work on the authenticated page
+  teardown(context)           always, last, while the context is still open (once per job)
+
+Each hook may also take `profile` (the run profile) and `account` (the
+job's username, e.g. to keep per-account state apart) keyword arguments.
+Hooks get the job's BrowserContext, never the Browser: login_tester.py owns
+the browser and context lifecycle, so plugins can run concurrently against
+a shared or pooled browser. Older scripts with only run_scraper(page,
+browser) still work as a scrape hook.
+
+Modules are imported once per path and reused until the file changes;
+register_plugin() / register_plugin_file() make a module, object or file
+available by name as well
+"""
+
+import os
+import inspect
+import importlib.util
+
+HOOKS = ("pre_login", "post_login", "scrape", "teardown")
+
+# Keyword arguments a hook gets if its signature names them
+HOOK_KEYWORDS = ("profile", "account")
+
+# name -> SitePlugin, for plugins registered in code
+REGISTRY = {}
+
+# realpath -> (mtime, SitePlugin), for plugins loaded from files
+_loaded = {}
+
+class SitePlugin:
+    """The hooks a site module (or object) defines, with how to call each"""
+
+    def __init__(self, name, source):
+        self.name = name
+        self.hooks = {}
+        for hook in HOOKS:
+            fn = getattr(source, hook, None)
+            if fn is not None:
+                self.hooks[hook] = (fn, _keywords(fn))
+
+        legacy = getattr(source, "run_scraper", None)
+        if "scrape" not in self.hooks and legacy is not None:
+            self.hooks["scrape"] = (legacy, _keywords(legacy))
+
+    def __contains__(self, hook):
+        return hook in self.hooks
+
+    async def call(self, hook, *args, profile=None, account=None):
+        """Run a hook if the plugin defines it; returns its result (None if absent)"""
+        if hook not in self.hooks:
+            return None
+        fn, keywords = self.hooks[hook]
+        given = {"profile": profile, "account": account}
+        return await fn(*args, **{name: given[name] for name in keywords})
+
+def _keywords(fn):
+    """The HOOK_KEYWORDS a hook function accepts"""
+    parameters = inspect.signature(fn).parameters
+    return tuple(name for name in HOOK_KEYWORDS if name in parameters)
+
+def register_plugin(name, source):
+    """Make a module or object with hook attributes available as site script `name`"""
+    REGISTRY[name] = SitePlugin(name, source)
+    return REGISTRY[name]
+
+def register_plugin_file(name, path):
+    """Load a site-script file and make it available as site script `name`"""
+    REGISTRY[name] = load_plugin(path)
+    return REGISTRY[name]
+
+def load_plugin(ref):
+    """
+    SitePlugin for a registered name or a path to a .py file
+    Files are imported once and cached; an edited file is re-imported
+    """
+    if ref in REGISTRY:
+        return REGISTRY[ref]
+
+    path = os.path.realpath(ref)
+    mtime = os.path.getmtime(path)
+    cached = _loaded.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    module_name = "site_plugin_" + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    plugin = SitePlugin(ref, module)
+    if not plugin.hooks:
+        raise ValueError(f"{ref} defines none of {', '.join(HOOKS)} (or run_scraper)")
+    _loaded[path] = (mtime, plugin)
+    return plugin
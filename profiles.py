@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Run profiles shared by login_tester.py and the site scripts
+
+- debug: visible browser, slow_mo and fixed pauses so you can watch each step
+- fast:  headless, no slow_mo, every fixed pause replaced by an event-driven wait
+"""
+
+import asyncio
+
+PROFILES = {
+    "debug": {
+        "headless": False,
+        "slow_mo": 1000,
+        "fixed_waits": True,        # keep the asyncio.sleep() pauses between steps
+        "wait_until": "networkidle",
+        "step_timeout": 30000,      # ms budget for any single action/navigation
+        "settle_timeout": 30000,    # ms to wait for the page to react after a click
+        "download_concurrency": 1,  # downloads in flight at once in site scripts
+        "direct_downloads": False,  # fetch plain file links over HTTP instead of clicking
+        "block_resources": False,   # abort image/media/font/tracker requests (network_filter.py)
+        "max_text_chars": 1000000,  # cap on the page text pulled into Python for classification
+    },
+    "fast": {
+        "headless": True,
+        "slow_mo": 0,
+        "fixed_waits": False,
+        "wait_until": "domcontentloaded",
+        "step_timeout": 10000,
+        "settle_timeout": 5000,
+        "download_concurrency": 4,
+        "direct_downloads": True,
+        "block_resources": True,
+        "max_text_chars": 100000,
+    },
+}
+
+DEFAULT_PROFILE = "debug"
+
+def get_profile(profile=None):
+    """Resolve a profile name (or an already-resolved profile dict) to a profile dict"""
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, dict):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}' - choose from: {', '.join(PROFILES)}")
+    return dict(PROFILES[profile], name=profile)
+
+def launch_options(profile):
+    """Keyword arguments for chromium.launch() under this profile"""
+    return {"headless": profile["headless"], "slow_mo": profile["slow_mo"]}
+
+def apply_timeouts(page, profile):
+    """Give every action and navigation on the page the profile's per-step budget"""
+    page.set_default_timeout(profile["step_timeout"])
+    page.set_default_navigation_timeout(profile["step_timeout"])
+
+async def pause(profile, seconds):
+    """Fixed pause that only happens in profiles that keep the visual delays"""
+    if profile["fixed_waits"]:
+        await asyncio.sleep(seconds)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Per-origin scheduling for batch runs
+Every site origin gets its own concurrency cap and token bucket (logins
+started per second), so scaling a batch up raises aggregate throughput
+without piling onto any single site. An origin that answers with HTTP 429
+or shows a throttling message is paused with jittered exponential backoff
+and its rate halved; successes creep the rate back up. Transient failures
+(timeouts, dropped connections) are retried with the same backoff
+"""
+
+import time
+import random
+import asyncio
+import contextlib
+
+from session_cache import url_origin
+from tracing import current_trace
+
+DEFAULT_ORIGIN_CONCURRENCY = 4  # jobs in flight per origin
+DEFAULT_ORIGIN_RATE = 2.0       # job starts per second per origin (None = unlimited)
+DEFAULT_RETRIES = 2             # extra attempts for transient failures / throttling
+
+BACKOFF_BASE = 1.0              # seconds, doubled per consecutive strike plus jitter
+BACKOFF_MAX = 60.0
+MIN_RATE = 0.1                  # the adaptive rate never drops below this
+RATE_STEP = 0.1                 # rate regained per successful job
+
+# Error messages worth another attempt: navigation/timeouts/connection drops
+TRANSIENT_ERRORS = (
+    "timeout", "net::err_", "target closed", "navigation failed", "connection reset",
+    "connection refused", "econnreset", "socket hang up",
+)
+
+def backoff_delay(strike):
+    """Jittered exponential backoff for the n-th consecutive strike (1-based)"""
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (strike - 1)) * (1 + random.random())
+
+class OriginLimiter:
+    """Concurrency cap + adaptive token bucket for one origin"""
+
+    def __init__(self, concurrency=DEFAULT_ORIGIN_CONCURRENCY, rate=DEFAULT_ORIGIN_RATE, burst=None):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or concurrency
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.strikes = 0
+        self._lock = asyncio.Lock()
+
+    async def _take_token(self):
+        # One waiter at a time, so jobs start in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.rate is None:
+                    return
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self):
+        """Throttling seen: pause the origin and halve its rate. Returns the pause in seconds"""
+        self.strikes += 1
+        delay = backoff_delay(self.strikes)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        if self.rate is not None:
+            self.rate = max(MIN_RATE, self.rate / 2)
+        return delay
+
+    def reward(self):
+        """A clean job: clear the strikes and regain some rate"""
+        self.strikes = 0
+        if self.rate is not None:
+            self.rate = min(self.max_rate, self.rate + RATE_STEP)
+
+class RateLimiter:
+    """
+    OriginLimiters created on demand; `overrides` maps an origin to its own
+    {"concurrency", "rate", "burst"} ("default" for jobs without a URL).
+    `total` caps jobs in flight across all origins (None = no overall cap)
+    """
+
+    def __init__(self, concurrency=DEFAULT_ORIGIN_CONCURRENCY, rate=DEFAULT_ORIGIN_RATE, burst=None, overrides=None,
+                 total=None):
+        self.defaults = {"concurrency": concurrency, "rate": rate, "burst": burst}
+        self.overrides = {k if k == "default" else url_origin(k): v for k, v in (overrides or {}).items()}
+        self.origins = {}
+        self.total = asyncio.Semaphore(total) if total else None
+
+    def for_url(self, url):
+        origin = url_origin(url) if url else "default"
+        if origin not in self.origins:
+            self.origins[origin] = OriginLimiter(**dict(self.defaults, **self.overrides.get(origin, {})))
+        return self.origins[origin]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        """
+        Hold one of the origin's concurrency slots, started within its rate
+        The overall slot is taken last, so jobs queued behind a busy or
+        paused origin never keep another origin's jobs waiting
+        """
+        limiter = self.for_url(url)
+        async with limiter.slots:
+            await limiter._take_token()
+            if self.total is None:
+                yield limiter
+            else:
+                async with self.total:
+                    yield limiter
+
+def watch_throttling(context, url):
+    """
+    Count HTTP 429 responses from the login site's origin into the current
+    trace's "http_429" field (the listener keeps the trace: Playwright events
+    run outside the job's context)
+    """
+    trace = current_trace()
+    if trace is None or not url:
+        return
+    origin = url_origin(url)
+
+    def on_response(response):
+        if response.status == 429 and url_origin(response.url) == origin:
+            trace.fields["http_429"] = trace.fields.get("http_429", 0) + 1
+
+    context.on("response", on_response)
+
+def attempt_verdict(report):
+    """
+    How a finished attempt (a RunTrace.to_dict report) should be handled:
+    "throttled" (429 / throttling message), "transient" (retryable error) or "done"
+    A successful login is always done, whatever 429s its page's XHRs got
+    """
+    if report["outcome"] == "success":
+        return "done"
+    if report.get("http_429") or (report.get("evidence") or {}).get("throttled"):
+        return "throttled"
+    error = (report.get("error") or "").lower()
+    if report["outcome"] == "error" and any(marker in error for marker in TRANSIENT_ERRORS):
+        return "transient"
+    return "done"
+
+async def run_scheduled(limiter, url, attempt, retries=DEFAULT_RETRIES):
+    """
+    Run `attempt()` (a coroutine function returning (success, report)) within
+    the origin's limits, retrying throttled/transient attempts with backoff.
+    No slot is held between attempts. Returns (success, report, attempts)
+    for the last attempt
+    """
+    for attempt_number in range(1, retries + 2):
+        async with limiter.slot(url) as origin:
+            success, report = await attempt()
+
+        verdict = attempt_verdict(report)
+        if verdict == "throttled":
+            delay = origin.penalize()
+            print(f"🐢 {url or 'default'} is throttling - pausing the origin {delay:.1f}s, rate now {origin.rate or 'unlimited'}/s")
+        elif verdict == "transient":
+            delay = backoff_delay(attempt_number)
+        else:
+            origin.reward()
+        if verdict == "done" or attempt_number > retries:
+            return success, report, attempt_number
+
+        print(f"🔁 Attempt {attempt_number} {verdict} ({report.get('error') or report['outcome']}) - retrying")
+        if verdict == "transient":
+            await asyncio.sleep(delay)
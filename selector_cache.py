@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Learned per-site selector memo for login_tester.py
+The first run against a site uses the generic fallback selector lists and
+records the concrete selector that matched for each field (username,
+password, next, submit, 2FA code, verify) plus whether the login is one-step
+or two-step. Later runs use those exact selectors and skip the password probe.
+A cached selector that stops working drops the site's entry
+
+Usage: python selector_cache.py list
+       python selector_cache.py export <file.json>
+       python selector_cache.py clear [url]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+from session_cache import url_origin
+
+SELECTOR_CACHE_PATH = ".selector_cache.json"
+
+# Builds a concrete CSS selector for an element: id, then a distinguishing
+# attribute, then a tag/nth-of-type path from <body>
+DESCRIBE_ELEMENT_JS = """
+el => {
+    const tag = el.tagName.toLowerCase();
+    const unique = sel => {
+        try { return document.querySelectorAll(sel).length === 1; } catch (e) { return false; }
+    };
+    const candidates = [];
+    if (el.id) candidates.push('#' + CSS.escape(el.id));
+    for (const attr of ['data-testid', 'name', 'autocomplete', 'aria-label', 'placeholder', 'type']) {
+        const value = el.getAttribute(attr);
+        if (value) candidates.push(`${tag}[${attr}="${value.replace(/["\\\\]/g, '\\\\$&')}"]`);
+    }
+    for (const sel of candidates) {
+        if (unique(sel)) return sel;
+    }
+    const parts = [];
+    for (let node = el; node && node !== document.body && node.parentElement; node = node.parentElement) {
+        const siblings = Array.from(node.parentElement.children).filter(c => c.tagName === node.tagName);
+        const part = node.tagName.toLowerCase();
+        parts.unshift(siblings.length > 1 ? `${part}:nth-of-type(${siblings.indexOf(node) + 1})` : part);
+    }
+    return ['body', ...parts].join(' > ');
+}
+"""
+
+def load_cache(path=SELECTOR_CACHE_PATH):
+    """{origin: {"flow", "selectors": {role: selector}, "updated_at"}}"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _update_cache(change, path=SELECTOR_CACHE_PATH):
+    """
+    Apply `change(cache)` to the file's current contents and swap the result
+    in through a temp file of its own, so concurrent runs (batch jobs, shard
+    workers) keep each other's entries. A failed write is logged, not raised
+    """
+    tmp_path = None
+    try:
+        cache = load_cache(path)
+        change(cache)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(path)),
+                                         prefix=os.path.basename(path), suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  Could not save the selector cache ({path}): {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class SelectorMemo:
+    """
+    Selector memo for one login run
+    act() performs an action with the cached selector for a role if there is
+    one, otherwise with the generic selector list, and learns what matched
+    """
+
+    def __init__(self, url, path=SELECTOR_CACHE_PATH, enabled=True):
+        self.origin = url_origin(url)
+        self.path = path
+        self.enabled = enabled
+        entry = load_cache(path).get(self.origin, {}) if enabled else {}
+        self.cached = dict(entry.get("selectors", {}))
+        self.flow = entry.get("flow")
+        self.from_cache = bool(entry)
+        self.learned = {}
+
+    async def act(self, page, role, generic_selector, action, *args, cached_timeout=None):
+        """
+        Run locator.<action>(*args) for `role`
+        Tries the cached exact selector first (bounded by `cached_timeout` ms);
+        if it fails the site's entry is invalidated and the generic selector
+        list is used. Returns the locator that worked
+        """
+        if role in self.cached:
+            locator = page.locator(self.cached[role]).first
+            try:
+                await getattr(locator, action)(*args, timeout=cached_timeout)
+                return locator
+            except Exception:
+                print(f"🧹 Cached {role} selector '{self.cached[role]}' failed - forgetting {self.origin}")
+                self.invalidate()
+
+        locator = page.locator(generic_selector).first
+        # Describe the element before acting on it - a click may navigate away
+        learned = await locator.evaluate(DESCRIBE_ELEMENT_JS) if self.enabled else None
+        await getattr(locator, action)(*args)
+        if learned:
+            self.learned[role] = learned
+        return locator
+
+    def invalidate(self):
+        """Forget this site's cached selectors and flow"""
+        self.cached = {}
+        self.flow = None
+        self.from_cache = False
+        if self.enabled and self.origin in load_cache(self.path):
+            _update_cache(lambda cache: cache.pop(self.origin, None), self.path)
+
+    def save(self, flow=None):
+        """Store newly learned selectors (and the flow) for this site"""
+        if flow is not None:
+            self.flow = flow
+        if not self.enabled or not self.learned:
+            return
+        learned = self.learned
+
+        def merge(cache):
+            entry = cache.setdefault(self.origin, {"selectors": {}})
+            entry["selectors"].update(learned)
+            entry["flow"] = self.flow
+            entry["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        _update_cache(merge, self.path)
+        self.cached.update(learned)
+        self.learned = {}
+
+def main():
+    """Inspect, export or clear the selector cache"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    cache = load_cache()
+
+    if command == "list":
+        if not cache:
+            print("📭 Selector cache is empty")
+        for origin, entry in sorted(cache.items()):
+            print(f"\n🌐 {origin} ({entry.get('flow') or 'unknown'} flow, updated {entry.get('updated_at')})")
+            for role, selector in sorted(entry.get("selectors", {}).items()):
+                print(f"   {role:<9} {selector}")
+    elif command == "export" and len(sys.argv) > 2:
+        with open(sys.argv[2], "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        print(f"📤 Exported {len(cache)} sites to {sys.argv[2]}")
+    elif command == "clear":
+        if len(sys.argv) > 2:
+            _update_cache(lambda cache: cache.pop(url_origin(sys.argv[2]), None))
+        else:
+            _update_cache(dict.clear)
+        print("🧹 Selector cache cleared")
+    else:
+        print(__doc__.strip().split("\n\n")[-1])
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Authenticated session cache for login_tester.py
+Saves Playwright storage_state (cookies + localStorage) after a successful
+login, keyed by (url origin, username), so later runs can skip the login flow
+"""
+
+import os
+import json
+import time
+import hashlib
+from urllib.parse import urlsplit
+
+SESSION_CACHE_DIR = ".session_cache"
+DEFAULT_SESSION_TTL = 3600              # seconds a saved session is trusted
+MAX_CACHE_ENTRIES = 200
+MAX_CACHE_BYTES = 20 * 1024 * 1024      # total on-disk size of the cache
+
+# Visible login-form fields: a page showing any of these is logged out. Not
+# input[type=text] - logged-in pages have search boxes too
+LOGIN_FORM_SELECTOR = (
+    'input[type="password"]:visible, input[name="username"]:visible, input[id="username"]:visible, '
+    'input[name="email"]:visible, input[id="email"]:visible, input[type="email"]:visible, '
+    'input[autocomplete="username"]:visible'
+)
+
+def url_origin(url):
+    """scheme://host[:port] part of a URL"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+def _cache_path(url, username, cache_dir):
+    key = hashlib.sha256(f"{url_origin(url)}\n{username}".encode("utf-8")).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{key}.json")
+
+def load_session(url, username, ttl=DEFAULT_SESSION_TTL, cache_dir=SESSION_CACHE_DIR):
+    """
+    Return the saved entry for (origin, username) - a dict with
+    "storage_state" and "landing_url" (the page the login ended on, if
+    known) - or None. Expired or unreadable entries are evicted
+    """
+    path = _cache_path(url, username, cache_dir)
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        _remove(path)
+        return None
+
+    if time.time() - entry.get("saved_at", 0) > ttl:
+        print(f"⌛ Cached session for {username} @ {url_origin(url)} expired")
+        _remove(path)
+        return None
+
+    return entry
+
+async def save_session(context, url, username, landing_url=None, cache_dir=SESSION_CACHE_DIR):
+    """
+    Save the context's storage_state for (origin, username) and prune the cache
+    `landing_url` is the post-login page, probed later to check the session
+    """
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    entry = {
+        "origin": url_origin(url),
+        "username": username,
+        "saved_at": time.time(),
+        "landing_url": landing_url,
+        "storage_state": await context.storage_state(),
+    }
+
+    path = _cache_path(url, username, cache_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    # Session cookies are credentials - keep them private to the user
+    os.chmod(tmp_path, 0o600)
+    os.replace(tmp_path, path)
+    print(f"💾 Session cached for {username} @ {entry['origin']}")
+
+    prune_cache(cache_dir=cache_dir)
+
+def invalidate_session(url, username, cache_dir=SESSION_CACHE_DIR):
+    """Drop the saved session for (origin, username)"""
+    _remove(_cache_path(url, username, cache_dir))
+
+def prune_cache(ttl=DEFAULT_SESSION_TTL, max_entries=MAX_CACHE_ENTRIES,
+                max_bytes=MAX_CACHE_BYTES, cache_dir=SESSION_CACHE_DIR):
+    """
+    Evict expired entries, then the oldest entries until the cache fits in
+    max_entries / max_bytes
+    """
+    try:
+        names = [n for n in os.listdir(cache_dir) if n.endswith(".json")]
+    except FileNotFoundError:
+        return
+
+    now = time.time()
+    entries = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if now - stat.st_mtime > ttl:
+            _remove(path)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    # Newest first - drop from the tail
+    entries.sort(reverse=True)
+    total_bytes = sum(size for _, size, _ in entries)
+    while entries and (len(entries) > max_entries or total_bytes > max_bytes):
+        _, size, path = entries.pop()
+        _remove(path)
+        total_bytes -= size
+
+async def probe_session(page, url, profile, landing_url=None, success_phrases=()):
+    """
+    Check whether a restored session is still logged in
+    Loads the post-login `landing_url` (or `url` for entries saved without
+    one). Any visible login field - username or password, so step one of a
+    two-step login counts - means logged out. Otherwise the session needs
+    positive evidence: still on the landing URL, or a success phrase
+    (e.g. "logout", "dashboard") in the page's visible text (capped at the
+    profile's max_text_chars)
+    """
+    try:
+        await page.goto(landing_url or url, wait_until=profile["wait_until"])
+        try:
+            await page.wait_for_load_state("networkidle", timeout=profile["settle_timeout"])
+        except Exception:
+            pass
+        if await page.locator(LOGIN_FORM_SELECTOR).count() > 0:
+            return False
+        if landing_url and page.url.split("#")[0] == landing_url.split("#")[0] and landing_url != url:
+            return True
+        # indicators imports url_origin from here
+        from indicators import extract_visible_text, get_matcher
+        text = await extract_visible_text(page, profile["max_text_chars"])
+        return bool(get_matcher({"success": list(success_phrases)}).scan(text.lower()))
+    except Exception as e:
+        print(f"⚠️  Session probe failed: {str(e)}")
+        return False
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Multi-process sharded runner for large credential batches
+Splits a job list across N worker processes, each with its own event loop
+and Chromium running jobs through batch_runner.run_job (test_login). Origins
+are spread over the shards by job count, largest first onto the least
+loaded shard; a large origin spans several shards, each getting its share
+of the site's per-origin limits. Jobs are handed out a few at a time;
+results stream back as each job finishes and are merged into one report in
+job order. If a worker process dies, the jobs it was holding go back to its
+queue (up to MAX_ATTEMPTS tries each) and a replacement worker takes them over
+
+Usage: python shard_runner.py [--shards N] [--profile fast|debug] [--session-cache] [--no-block] [--2fa provider]
+                              [--per-origin N] [--rate R] [--retries N]
+                              [--report batch.jsonl] [--verbose] <jobs.csv|jobs.jsonl> [concurrency_per_shard]
+
+Worker output is silenced unless --verbose; a 2FA prompt needs a terminal,
+so use a totp:/file: provider for 2FA accounts. --per-origin and --rate
+apply per site across all shards: a site served by k shards gets 1/k of
+each on every one of them
+"""
+
+import os
+import sys
+import time
+import queue
+import asyncio
+import multiprocessing
+from collections import deque
+from playwright.async_api import async_playwright
+
+from batch_runner import DEFAULT_BATCH_PROFILE, load_jobs, print_summary, run_job
+from login_tester import pop_option, pop_flag
+from profiles import PROFILES, get_profile, launch_options
+from tracing import RunTrace, summarize, write_jsonl, quiet_output
+from rate_limit import DEFAULT_ORIGIN_CONCURRENCY, DEFAULT_ORIGIN_RATE, DEFAULT_RETRIES, RateLimiter
+from session_cache import url_origin
+
+DEFAULT_SHARD_CONCURRENCY = 4
+MAX_ATTEMPTS = 2        # tries per job before a dying worker marks it failed
+RESULT_POLL = 0.5       # seconds between worker liveness checks
+
+def _worker_main(shard, inbox, outbox, settings):
+    """Worker process entry point: run jobs from `inbox` until the None sentinel"""
+    with quiet_output(not settings["verbose"]):
+        asyncio.run(_worker(shard, inbox, outbox, settings))
+
+async def _worker(shard, inbox, outbox, settings):
+    profile = get_profile(settings["profile"])
+    # The parent never hands a worker more than 2 x concurrency jobs; the
+    # limiter runs `concurrency` of them at once, origin limits first
+    limiter = RateLimiter(settings["per_origin"], settings["rate"], overrides=settings["origin_limits"],
+                          total=settings["concurrency"])
+    running = set()
+
+    async def run(index, job):
+        result = await run_job(browser, index, job, settings["total"], profile,
+                               settings["session_cache"], settings["network_filter"], settings["twofa"],
+                               limiter, settings["retries"])
+        outbox.put((shard, index, dict(result, shard=shard)))
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(**launch_options(profile))
+        try:
+            while True:
+                # Blocking queue read - keep it off the event loop so running jobs progress
+                item = await asyncio.to_thread(inbox.get)
+                if item is None:
+                    break
+                task = asyncio.create_task(run(*item))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            await asyncio.gather(*running)
+        finally:
+            await browser.close()
+
+def _failed_result(index, job, error):
+    trace = RunTrace(job=index + 1)
+    trace.finish("error", error=error)
+    return {
+        "job": index + 1, "username": job["username"], "url": job["url"], "site_script": job["site_script"],
+        "success": False, "error": error, "report": trace.to_dict(),
+    }
+
+def plan_slots(jobs, shards, per_origin):
+    """
+    Spread job indexes over `shards` slots by origin: the largest origin goes
+    onto the least loaded slots first, spanning as many slots as it has a
+    fair share of jobs for (at most `per_origin`, so each slot still gets
+    one of its concurrency slots). Returns (pending deques per slot,
+    {origin: number of slots serving it})
+    """
+    by_origin = {}
+    for index, job in enumerate(jobs):
+        by_origin.setdefault(url_origin(job["url"]) if job["url"] else "default", []).append(index)
+    share = -(-len(jobs) // shards)
+    pending = [[] for _ in range(shards)]
+    spans = {}
+    for origin, indexes in sorted(by_origin.items(), key=lambda item: -len(item[1])):
+        span = max(1, min(shards, per_origin, -(-len(indexes) // share)))
+        slots = sorted(range(shards), key=lambda slot: len(pending[slot]))[:span]
+        for n, index in enumerate(indexes):
+            pending[slots[n % span]].append(index)
+        spans[origin] = span
+    return [deque(sorted(backlog)) for backlog in pending], spans
+
+def split_limits(spans, per_origin, rate):
+    """RateLimiter overrides giving each of an origin's shards its share of `per_origin` and `rate`"""
+    return {
+        origin: {"concurrency": max(1, per_origin // span), "rate": rate / span if rate else rate}
+        for origin, span in spans.items() if span > 1
+    }
+
+def run_sharded(jobs, shards=None, concurrency=DEFAULT_SHARD_CONCURRENCY, profile=DEFAULT_BATCH_PROFILE,
+                session_cache=False, network_filter=None, twofa=None, verbose=False, on_result=None,
+                per_origin=DEFAULT_ORIGIN_CONCURRENCY, rate=DEFAULT_ORIGIN_RATE, retries=DEFAULT_RETRIES):
+    """
+    Run `jobs` across `shards` worker processes (default: one per CPU core)
+    `on_result(result)` is called in the parent as each job finishes, in
+    completion order. Returns the result dicts in job order (see
+    batch_runner.run_batch), each tagged with the "shard" that ran it.
+    An origin spread over several shards has `per_origin` and `rate`
+    divided between them, so the limits hold for the whole run
+    """
+    shards = max(1, min(shards or os.cpu_count() or 1, len(jobs) or 1))
+    pending, spans = plan_slots(jobs, shards, per_origin)     # slot -> job indexes waiting for that slot's worker
+    settings = {
+        "profile": profile, "concurrency": concurrency, "total": len(jobs), "session_cache": session_cache,
+        "network_filter": network_filter, "twofa": twofa, "verbose": verbose,
+        "per_origin": per_origin, "rate": rate, "retries": retries,
+        "origin_limits": split_limits(spans, per_origin, rate),
+    }
+    # A fresh interpreter per worker: no inherited event loop or Playwright state
+    mp = multiprocessing.get_context("spawn")
+    outbox = mp.Queue()
+    attempts = [0] * len(jobs)
+    results = [None] * len(jobs)
+    workers = {}        # shard -> {"slot", "process", "inbox", "holding": set of job indexes}
+    next_shard = 0
+    restarts_left = shards * MAX_ATTEMPTS
+
+    def start_worker(slot):
+        nonlocal next_shard
+        inbox = mp.Queue()
+        process = mp.Process(target=_worker_main, args=(next_shard, inbox, outbox, settings), daemon=True)
+        process.start()
+        workers[next_shard] = {"slot": slot, "process": process, "inbox": inbox, "holding": set()}
+        next_shard += 1
+
+    def finish(index, result):
+        results[index] = result
+        if on_result:
+            on_result(result)
+
+    for slot in range(shards):
+        if pending[slot]:
+            start_worker(slot)
+
+    try:
+        while any(r is None for r in results):
+            # Keep each worker's backlog at two rounds of its concurrency
+            for worker in workers.values():
+                backlog = pending[worker["slot"]]
+                while backlog and len(worker["holding"]) < concurrency * 2:
+                    index = backlog.popleft()
+                    attempts[index] += 1
+                    worker["holding"].add(index)
+                    worker["inbox"].put((index, jobs[index]))
+
+            try:
+                shard, index, result = outbox.get(timeout=RESULT_POLL)
+                if shard in workers:
+                    workers[shard]["holding"].discard(index)
+                if results[index] is None:      # a re-queued job may finish twice
+                    finish(index, result)
+            except queue.Empty:
+                pass
+
+            for shard, worker in list(workers.items()):
+                if worker["process"].is_alive():
+                    continue
+                del workers[shard]
+                slot = worker["slot"]
+                lost = sorted(i for i in worker["holding"] if results[i] is None)
+                print(f"💥 Shard {shard} exited ({worker['process'].exitcode}) holding {len(lost)} jobs")
+                for index in reversed(lost):
+                    if attempts[index] >= MAX_ATTEMPTS:
+                        finish(index, _failed_result(index, jobs[index], f"worker died ({MAX_ATTEMPTS} attempts)"))
+                    else:
+                        pending[slot].appendleft(index)
+                if pending[slot] and restarts_left > 0:
+                    restarts_left -= 1
+                    start_worker(slot)
+
+            # Slots whose worker is gone for good: nothing will run their jobs
+            served = {worker["slot"] for worker in workers.values()}
+            for slot, backlog in enumerate(pending):
+                if backlog and slot not in served:
+                    for index in backlog:
+                        finish(index, _failed_result(index, jobs[index], "no workers left"))
+                    backlog.clear()
+    finally:
+        for worker in workers.values():
+            worker["inbox"].put(None)
+        for worker in workers.values():
+            worker["process"].join(timeout=30)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+
+    return results
+
+def main():
+    """Main function to handle command line arguments"""
+    argv = sys.argv[1:]
+    shards = pop_option(argv, "--shards")
+    profile = pop_option(argv, "--profile", DEFAULT_BATCH_PROFILE)
+    session_cache = pop_flag(argv, "--session-cache")
+    network_filter = False if pop_flag(argv, "--no-block") else None
+    twofa = pop_option(argv, "--2fa")
+    report_path = pop_option(argv, "--report")
+    verbose = pop_flag(argv, "--verbose")
+    per_origin = int(pop_option(argv, "--per-origin", DEFAULT_ORIGIN_CONCURRENCY))
+    rate = float(pop_option(argv, "--rate", DEFAULT_ORIGIN_RATE)) or None     # --rate 0: no rate limit
+    retries = int(pop_option(argv, "--retries", DEFAULT_RETRIES))
+    if profile not in PROFILES:
+        print(f"❌ Unknown profile '{profile}' - choose from: {', '.join(PROFILES)}")
+        sys.exit(1)
+
+    if len(argv) < 1:
+        print(__doc__.strip().split("\n\n", 1)[1])
+        sys.exit(1)
+
+    jobs = load_jobs(argv[0])
+    concurrency = int(argv[1]) if len(argv) > 1 else DEFAULT_SHARD_CONCURRENCY
+    shards = int(shards) if shards else None
+
+    def progress(result):
+        status = "✅" if result["success"] else "❌"
+        print(f"   {status} #{result['job']} {result['username']} (shard {result.get('shard', '-')}, "
+              f"{result['report']['duration_ms'] / 1000:.1f}s)")
+
+    started = time.monotonic()
+    print(f"🚀 Running {len(jobs)} jobs on up to {shards or os.cpu_count()} shards x {concurrency} ({profile} profile)")
+    results = run_sharded(jobs, shards, concurrency, profile, session_cache, network_filter, twofa,
+                          verbose=verbose, on_result=progress, per_origin=per_origin, rate=rate, retries=retries)
+    print_summary(results)
+    print(f"   🧮 {len(results) / (time.monotonic() - started):.2f} jobs/s overall")
+
+    if report_path:
+        reports = [r["report"] for r in results]
+        write_jsonl(report_path, reports + [summarize(reports)])
+        print(f"📝 Merged report appended to: {report_path}")
+
+    if not all(r["success"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Persistent scrape state for site scripts
+A SQLite index in the downloads folder remembers, per site origin and
+account, every remote file that was saved: its name, a fingerprint of how
+the portal lists it (the row's cells - size, modified date...), its checksum
+and where it was saved. A later run downloads only files whose listing
+changed. Each finished file is committed at once, so a run that dies halfway
+resumes where it stopped instead of starting over. Runs record their process
+and a heartbeat: only a run whose process is gone (or that has gone quiet for
+RUN_STALE_AFTER) counts as interrupted, never one still going in another job
+
+Usage: python state_index.py list [downloads_dir]
+       python state_index.py clear [url] [downloads_dir]
+"""
+
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+from datetime import datetime
+
+from session_cache import url_origin
+
+# Dot-prefixed so the download manifest doesn't adopt it as a downloaded file
+STATE_DB_NAME = ".scrape_state.db"
+
+RUN_STALE_AFTER = 15 * 60   # seconds without a heartbeat before an open run counts as interrupted
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    origin TEXT NOT NULL,
+    account TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    sha256 TEXT,
+    size INTEGER,
+    saved_as TEXT,
+    downloaded_at TEXT,
+    PRIMARY KEY (origin, account, name)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    account TEXT NOT NULL DEFAULT '',
+    pid INTEGER,
+    heartbeat REAL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    downloaded INTEGER DEFAULT 0,
+    unchanged INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0
+);
+"""
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def _open_db(path):
+    """Connect to the state database, creating it or upgrading an index from before accounts"""
+    db = sqlite3.connect(path, timeout=30)
+    db.isolation_level = None
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        columns = {row[1] for row in db.execute("PRAGMA table_info(files)")}
+        if columns and "account" not in columns:
+            # The primary key changes - rebuild the table; old entries belong to no account
+            db.execute("ALTER TABLE files RENAME TO files_v1")
+        for statement in SCHEMA.split(";"):
+            if statement.strip():
+                db.execute(statement)
+        if columns and "account" not in columns:
+            db.execute("INSERT INTO files (origin, name, fingerprint, sha256, size, saved_as, downloaded_at) "
+                       "SELECT origin, name, fingerprint, sha256, size, saved_as, downloaded_at FROM files_v1")
+            db.execute("DROP TABLE files_v1")
+        run_columns = {row[1] for row in db.execute("PRAGMA table_info(runs)")}
+        for column, kind in (("account", "TEXT NOT NULL DEFAULT ''"), ("pid", "INTEGER"), ("heartbeat", "REAL")):
+            if column not in run_columns:
+                db.execute(f"ALTER TABLE runs ADD COLUMN {column} {kind}")
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        db.close()
+        raise
+    db.isolation_level = ""
+    return db
+
+def _process_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True     # exists, owned by someone else
+    return True
+
+def row_fingerprint(row):
+    """Fingerprint of a table row's listing: changes when its size/date/etc. cells do"""
+    return hashlib.sha256("\x1f".join(row["cells"] or [row["text"]]).encode("utf-8")).hexdigest()
+
+class StateIndex:
+    """
+    Scrape state of one site origin and account (the job's username - the
+    same file name can hold different files per account), stored in
+    downloads_dir/.scrape_state.db
+    """
+
+    def __init__(self, downloads_dir, url, account=None):
+        os.makedirs(downloads_dir, exist_ok=True)
+        self.downloads_dir = downloads_dir
+        self.origin = url_origin(url)
+        self.account = account or ""
+        self.db = _open_db(os.path.join(downloads_dir, STATE_DB_NAME))
+        self.run_id = None
+        self.unchanged = []
+
+    def start_run(self):
+        """
+        Open a run record; returns the start time of an earlier run of this
+        origin and account that never finished (it is being resumed), or None.
+        Runs still alive in another job or process are left alone
+        """
+        with self.db:
+            open_runs = self.db.execute(
+                "SELECT id, started_at, pid, heartbeat FROM runs "
+                "WHERE origin = ? AND account = ? AND finished_at IS NULL ORDER BY id",
+                (self.origin, self.account),
+            ).fetchall()
+            stale = [(run_id, started_at) for run_id, started_at, pid, heartbeat in open_runs
+                     if not _process_alive(pid) or time.time() - (heartbeat or 0) > RUN_STALE_AFTER]
+            self.db.executemany("UPDATE runs SET finished_at = 'interrupted' WHERE id = ?",
+                                [(run_id,) for run_id, _ in stale])
+            self.run_id = self.db.execute(
+                "INSERT INTO runs (origin, account, pid, heartbeat, started_at) VALUES (?, ?, ?, ?, ?)",
+                (self.origin, self.account, os.getpid(), time.time(), _now()),
+            ).lastrowid
+        return stale[-1][1] if stale else None
+
+    def is_unchanged(self, name, fingerprint):
+        """
+        True if `name` was saved before with this same listing and the saved
+        copy is still on disk - it doesn't need downloading again
+        """
+        entry = self.db.execute(
+            "SELECT fingerprint, saved_as FROM files WHERE origin = ? AND account = ? AND name = ?",
+            (self.origin, self.account, name),
+        ).fetchone()
+        if not entry or entry[0] != fingerprint or not entry[1]:
+            return False
+        if not os.path.exists(os.path.join(self.downloads_dir, entry[1])):
+            return False
+        self.unchanged.append(name)
+        self._count("unchanged")
+        return True
+
+    def record(self, name, fingerprint, result):
+        """Checkpoint one download result (a download_all() result dict)"""
+        if "error" in result:
+            self._count("failed")
+            return
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO files (origin, account, name, fingerprint, sha256, size, saved_as, downloaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.origin, self.account, name, fingerprint, result["sha256"], result["size"], result["file"], _now()),
+            )
+        self._count("downloaded")
+
+    def _count(self, column):
+        # Every checkpoint doubles as the run's heartbeat
+        if self.run_id is not None:
+            with self.db:
+                self.db.execute(f"UPDATE runs SET {column} = {column} + 1, heartbeat = ? WHERE id = ?",
+                                (time.time(), self.run_id))
+
+    def finish_run(self):
+        """Mark the run complete - a run left open is reported as resumed next time"""
+        if self.run_id is not None:
+            with self.db:
+                self.db.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (_now(), self.run_id))
+
+    def close(self):
+        self.db.close()
+
+def main():
+    """List or clear the scrape state of a downloads folder"""
+    argv = sys.argv[1:]
+    command = argv.pop(0) if argv else "list"
+    origin = url_origin(argv.pop(0)) if command == "clear" and argv and "://" in argv[0] else None
+    downloads_dir = argv[0] if argv else "downloads"
+    path = os.path.join(downloads_dir, STATE_DB_NAME)
+    if not os.path.exists(path):
+        print(f"📭 No scrape state in {downloads_dir}/")
+        return
+
+    db = _open_db(path)
+    if command == "list":
+        for site, account, count, last in db.execute(
+                "SELECT origin, account, COUNT(*), MAX(downloaded_at) FROM files "
+                "GROUP BY origin, account ORDER BY origin, account"):
+            print(f"🌐 {site} ({account or 'no account'}): {count} files indexed, last download {last}")
+        for site, account, started, finished, downloaded, unchanged, failed in db.execute(
+                "SELECT origin, account, started_at, finished_at, downloaded, unchanged, failed "
+                "FROM runs ORDER BY id DESC LIMIT 10"):
+            print(f"   {started} {site} ({account or 'no account'}) -> {finished or 'running'}: "
+                  f"{downloaded} downloaded, {unchanged} unchanged, {failed} failed")
+    elif command == "clear":
+        with db:
+            if origin:
+                db.execute("DELETE FROM files WHERE origin = ?", (origin,))
+                db.execute("DELETE FROM runs WHERE origin = ?", (origin,))
+            else:
+                db.execute("DELETE FROM files")
+                db.execute("DELETE FROM runs")
+        print("🧹 Scrape state cleared")
+    else:
+        print(__doc__.strip().split("\n\n")[-1])
+        sys.exit(1)
+    db.close()
+
+if __name__ == "__main__":
+    main()
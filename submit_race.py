@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Post-submit detection for login_tester.py
+Instead of sitting out a fixed settle time after the login click, race the
+signals that tell how it went: the URL changing, an error message
+appearing, a one-time-code input appearing, or a logged-in-only element
+(logout link) appearing. The first signal to fire ends the wait and the
+other waits are cancelled, so a rejected password is reported as soon as
+the page says so. Signals already showing before the click are ignored.
+
+An error only counts when it reads like one (an error indicator phrase),
+and it gets a short grace period in which a navigation or success signal
+still wins - cookie banners, toasts and validation hints are no verdict
+"""
+
+import asyncio
+
+# Containers errors usually render in (plain CSS - also queried in the page).
+# They only signal a failure when their text holds an error phrase
+ERROR_SELECTOR = (
+    '[role="alert"], .error, .error-message, .alert-danger, .alert-error, .flash.error, '
+    '.invalid-feedback, .form-error, #error'
+)
+TWOFA_INPUT_SELECTOR = (
+    'input[autocomplete="one-time-code"], input[name*="otp" i], input[id*="otp" i], '
+    'input[name*="code" i], input[id*="code" i], input[placeholder*="code" i]'
+)
+SUCCESS_SELECTOR = (
+    'a[href*="logout" i], a[href*="log-out" i], a[href*="signout" i], a[href*="sign-out" i], '
+    'form[action*="logout" i], [data-testid*="logout" i]'
+)
+
+RACE_POLL_MS = 100      # how often the error check re-reads the page
+FAILURE_GRACE = 1.0     # seconds a navigation/success signal may still overturn an error
+
+# What is showing right now - the baseline the race has to improve on:
+# which signal selectors are visible, the error phrases in the page text and
+# the text of each visible error container
+BASELINE_JS = """
+([selectors, phrases, errorSelector]) => {
+    const visible = el => el.offsetWidth || el.offsetHeight || el.getClientRects().length;
+    const showing = {};
+    for (const [signal, sel] of Object.entries(selectors)) {
+        try { showing[signal] = Array.from(document.querySelectorAll(sel)).some(visible); }
+        catch (e) { showing[signal] = false; }
+    }
+    const text = document.body ? document.body.innerText.toLowerCase() : '';
+    const boxes = Array.from(document.querySelectorAll(errorSelector)).filter(visible)
+        .map(el => (el.innerText || '').toLowerCase());
+    return [showing, phrases.filter(p => text.includes(p)), boxes];
+}
+"""
+
+# Truthy (the matched phrase) once the page shows an error it did not show
+# before: a visible error container with new error-phrase text, or an error
+# phrase that was nowhere on the page
+NEW_ERROR_JS = """
+([phrases, phrasesBefore, boxesBefore, errorSelector]) => {
+    if (!document.body) return false;
+    const visible = el => el.offsetWidth || el.offsetHeight || el.getClientRects().length;
+    for (const el of document.querySelectorAll(errorSelector)) {
+        if (!visible(el)) continue;
+        const text = (el.innerText || '').toLowerCase();
+        if (boxesBefore.includes(text)) continue;
+        const phrase = phrases.find(p => text.includes(p));
+        if (phrase) return phrase;
+    }
+    const text = document.body.innerText.toLowerCase();
+    return phrases.find(p => !phrasesBefore.includes(p) && text.includes(p)) || false;
+}
+"""
+
+class SubmitRace:
+    """
+    arm() just before clicking submit, wait() right after
+    wait() returns (signal, detail): signal is "url", "failure", "2fa",
+    "success", "idle" (debug profile: network went quiet) or None when
+    nothing fired within the profile's settle_timeout
+    """
+
+    def __init__(self, page, profile, error_phrases, twofa=True):
+        self.page = page
+        self.profile = profile
+        self.error_phrases = [p.lower() for p in error_phrases]
+        self.selectors = {"success": SUCCESS_SELECTOR}
+        if twofa:
+            self.selectors["2fa"] = TWOFA_INPUT_SELECTOR
+        self.url = None
+        self.showing = {}
+        self.phrases_before = []
+        self.boxes_before = []
+
+    async def arm(self):
+        """Note the URL and whatever is already on the page (one evaluate call)"""
+        self.url = self.page.url
+        try:
+            self.showing, self.phrases_before, self.boxes_before = await self.page.evaluate(
+                BASELINE_JS, [self.selectors, self.error_phrases, ERROR_SELECTOR])
+        except Exception:
+            # Can't tell what was there before - don't trust the selector/text signals
+            self.showing = dict.fromkeys(self.selectors, True)
+            self.phrases_before = list(self.error_phrases)
+            self.boxes_before = []
+
+    async def wait(self):
+        page = self.page
+        timeout = self.profile["settle_timeout"]
+
+        async def url_changed():
+            await page.wait_for_url(lambda u: u != self.url, timeout=timeout)
+            return page.url
+
+        async def appeared(selector):
+            await page.locator(selector).first.wait_for(state="visible", timeout=timeout)
+            return selector
+
+        async def new_error():
+            handle = await page.wait_for_function(
+                NEW_ERROR_JS, arg=[self.error_phrases, self.phrases_before, self.boxes_before, ERROR_SELECTOR],
+                polling=RACE_POLL_MS, timeout=timeout)
+            return await handle.json_value()
+
+        async def idle():
+            await page.wait_for_load_state("networkidle", timeout=timeout)
+
+        racers = {asyncio.create_task(url_changed()): "url"}
+        for signal, selector in self.selectors.items():
+            if not self.showing.get(signal):
+                racers[asyncio.create_task(appeared(selector))] = signal
+        if self.error_phrases:
+            racers[asyncio.create_task(new_error())] = "failure"
+        if self.profile["fixed_waits"]:
+            racers[asyncio.create_task(idle())] = "idle"
+
+        pending = set(racers)
+        try:
+            winner = await self._first(racers, pending, None)
+            if winner and winner[0] == "failure":
+                # An error that shows while a redirect is on its way is not the verdict yet
+                overturning = {t for t in pending if racers[t] in ("url", "success")}
+                later = await self._first(racers, overturning, FAILURE_GRACE)
+                if later:
+                    return later
+            return winner or (None, None)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    @staticmethod
+    async def _first(racers, tasks, timeout):
+        """(signal, detail) of the first of `tasks` to succeed (None if none does within `timeout`)"""
+        deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+        while tasks:
+            remaining = None if deadline is None else deadline - asyncio.get_running_loop().time()
+            if remaining is not None and remaining <= 0:
+                return None
+            done, _ = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            tasks.difference_update(done)
+            for task in done:
+                # A wait that timed out or broke just drops out of the race
+                if not task.cancelled() and task.exception() is None:
+                    return racers[task], task.result()
+        return None
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Table extraction for site scripts
+Pulls every row of a files table - cell texts, row text and the row's
+download control - in a single page.evaluate() instead of one CDP round trip
+per row/cell. Handles paginated tables (Next button) and virtualized tables
+(rows rendered while a scroll container scrolls)
+"""
+
+TABLE_ROW_SELECTORS = [
+    'table tr',           # Standard table rows
+    '[role="table"] tr',  # ARIA table
+    '.table tr',          # CSS class table
+    'tbody tr',           # Table body rows
+    '[role="row"]',       # Div-based grids (often virtualized)
+]
+
+NEXT_PAGE_SELECTOR = (
+    'a[rel="next"], button[aria-label*="next" i], a[aria-label*="next" i], '
+    'button:has-text("Next"), a:has-text("Next")'
+)
+
+# Attribute used to tag each row's download control so it can be clicked later
+TARGET_ATTR = "data-lt-download"
+
+EXTRACT_ROWS_JS = """
+([selectors, seenKeys, attr]) => {
+    const seen = new Set(seenKeys);
+    const isDownload = el => {
+        const cls = el.getAttribute('class') || '';
+        return cls.includes('download') ||
+            (el.matches('button, a') && /download/i.test(el.textContent || ''));
+    };
+    for (const selector of selectors) {
+        const rows = Array.from(document.querySelectorAll(selector));
+        if (rows.length <= 1) continue;   // header only
+        window.__ltTag = window.__ltTag || 0;
+        const out = [];
+        for (const row of rows) {
+            const text = (row.innerText || '').trim();
+            const key = row.getAttribute('data-key') || row.getAttribute('data-id') ||
+                row.getAttribute('data-row-key') || text;
+            if (!text || seen.has(key)) continue;
+            seen.add(key);
+            const cells = Array.from(row.querySelectorAll('td, th, [role="cell"], [role="gridcell"]'))
+                .map(cell => (cell.innerText || '').trim());
+            const control = Array.from(row.querySelectorAll('button, a, [class*="download"]')).find(isDownload);
+            let target = null;
+            if (control) {
+                target = control.getAttribute(attr) || String(++window.__ltTag);
+                control.setAttribute(attr, target);
+            }
+            out.push({
+                key, text, cells, target,
+                header: !row.querySelector('td, [role="cell"], [role="gridcell"]'),
+                href: control && control.href ? control.href : null,
+            });
+        }
+        return {selector, total: rows.length, rows: out};
+    }
+    return null;
+}
+"""
+
+# Scroll the nearest scrollable ancestor of the table rows by one viewport
+SCROLL_ROWS_JS = """
+async (selector) => {
+    const row = document.querySelector(selector);
+    let box = row && row.parentElement;
+    while (box && box !== document.body) {
+        const style = getComputedStyle(box);
+        if (/(auto|scroll)/.test(style.overflowY) && box.scrollHeight > box.clientHeight) break;
+        box = box.parentElement;
+    }
+    if (!box || box === document.body) return false;
+    const before = box.scrollTop;
+    box.scrollTop = before + box.clientHeight;
+    await new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    return box.scrollTop > before;
+}
+"""
+
+FIRST_ROW_CHANGED_JS = """
+([selector, previous]) => {
+    const rows = document.querySelectorAll(selector);
+    return rows.length > 1 && (rows[1].innerText || '').trim() !== previous;
+}
+"""
+
+async def extract_rows(page, row_selectors=TABLE_ROW_SELECTORS, seen_keys=()):
+    """
+    One evaluate call: rows of the first selector that matches a real table
+    Returns (selector, rows) or (None, []). Each row is a dict with key, text,
+    cells, header, href and `locator` (the row's download control, or None).
+    Rows whose key is in `seen_keys` are skipped
+    """
+    found = await page.evaluate(EXTRACT_ROWS_JS, [list(row_selectors), list(seen_keys), TARGET_ATTR])
+    if not found:
+        return None, []
+
+    rows = []
+    for row in found["rows"]:
+        row["locator"] = page.locator(f'[{TARGET_ATTR}="{row["target"]}"]') if row["target"] else None
+        rows.append(row)
+    return found["selector"], rows
+
+async def iter_table_rows(page, row_selectors=TABLE_ROW_SELECTORS, max_pages=100, page_timeout=10000):
+    """
+    Async generator yielding batches of not-yet-seen rows
+    Each batch's download locators are valid until the next batch is
+    requested, so download a batch's files before moving on. Scrolls a
+    virtualized table to the end, then follows the Next button until it is
+    gone, disabled or `max_pages` is reached
+    """
+    seen = set()
+    for page_number in range(1, max_pages + 1):
+        selector, rows = await extract_rows(page, row_selectors, seen)
+        if selector is None:
+            return
+        row_selectors = [selector]      # stick to the selector that worked
+
+        # Virtualized table: keep scrolling while new rows keep appearing
+        while rows:
+            seen.update(row["key"] for row in rows)
+            yield rows
+            if not await page.evaluate(SCROLL_ROWS_JS, selector):
+                break
+            _, rows = await extract_rows(page, row_selectors, seen)
+
+        # Paginated table: move to the next page if there is one
+        next_button = page.locator(NEXT_PAGE_SELECTOR).first
+        try:
+            if not await next_button.count() or not await next_button.is_enabled() or \
+                    await next_button.get_attribute("aria-disabled") == "true":
+                return
+            first_row = (await page.locator(selector).nth(1).inner_text()).strip()
+            print(f"📄 Moving to table page {page_number + 1}...")
+            await next_button.click()
+            await page.wait_for_function(FIRST_ROW_CHANGED_JS, arg=[selector, first_row], timeout=page_timeout)
+        except Exception:
+            return
+
+def index_targets(target_files):
+    """
+    (set of wanted file names for O(1) row matching, the same names longest
+    first for the substring fallback) - drop a found name from both
+    """
+    return set(target_files), sorted(set(target_files), key=len, reverse=True)
+
+def match_row(row, targets, by_length):
+    """
+    Name of the wanted file this row lists, or None
+    Looks up each cell, and each whitespace-separated word of the row
+    (for cells like "📄 Report.pdf"), in the `targets` set; failing that,
+    the first of `by_length` contained in the row text (names with spaces
+    like "Q3 report.pdf", or partial names)
+    """
+    for cell in row["cells"]:
+        if cell in targets:
+            return cell
+    for word in row["text"].split():
+        if word in targets:
+            return word
+    for target in by_length:
+        if target in row["text"]:
+            return target
+    return None
@@ -0,0 +1,22 @@
+from indicators import DEFAULT_INDICATORS, classify, indicators_for_url
+
+def test_partial_override_keeps_other_categories():
+    indicators = indicators_for_url("https://a.test/login", {"error": ["nope, not you"]})
+    assert indicators["error"] == ["nope, not you"]
+    assert indicators["success"] == DEFAULT_INDICATORS["success"]
+    assert indicators["twofa"] == DEFAULT_INDICATORS["twofa"]
+
+def test_classify_with_partial_override():
+    failure = classify("Nope, not you", "https://a.test/login", "https://a.test/login", {"error": ["nope, not you"]})
+    assert failure["outcome"] == "failure"
+    # "invalid" is a default error phrase, replaced by the override
+    unknown = classify("Invalid password", "https://a.test/login", "https://a.test/login", {"error": ["nope"]})
+    assert unknown["outcome"] == "unknown"
+    success = classify("Welcome back", "https://a.test/login", "https://a.test/home", {"error": ["nope"]})
+    assert success["outcome"] == "success"
+
+def test_classify_without_error_category():
+    verdict = classify("Your dashboard", "https://a.test/login", "https://a.test/home", {"success": ["your dashboard"]})
+    assert verdict["outcome"] == "success"
+    assert classify("Invalid password", "https://a.test/login", "https://a.test/login",
+                    {"success": ["x"]})["outcome"] == "failure"
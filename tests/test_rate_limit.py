@@ -0,0 +1,110 @@
+import time
+import asyncio
+
+import rate_limit
+from indicators import classify
+from rate_limit import RateLimiter, attempt_verdict, run_scheduled
+
+def test_success_is_never_throttled():
+    verdict = classify("Welcome to your dashboard - API rate limit: 100/h", "https://a.test/login", "https://a.test/home")
+    assert verdict["outcome"] == "success"
+    report = {"outcome": "success", "evidence": verdict["evidence"], "http_429": 1}
+    assert attempt_verdict(report) == "done"
+
+def test_failed_attempt_verdicts():
+    assert attempt_verdict({"outcome": "failure", "http_429": 2}) == "throttled"
+    assert attempt_verdict({"outcome": "failure", "evidence": {"throttled": ["too many attempts"]}}) == "throttled"
+    assert attempt_verdict({"outcome": "error", "error": "Timeout 10000ms exceeded"}) == "transient"
+    assert attempt_verdict({"outcome": "error", "error": "net::ERR_CONNECTION_RESET"}) == "transient"
+    assert attempt_verdict({"outcome": "failure", "evidence": {"error": ["invalid"]}}) == "done"
+    assert attempt_verdict({"outcome": "error", "error": "no username field"}) == "done"
+
+def test_per_origin_cap_does_not_block_other_origins():
+    async def main():
+        limiter = RateLimiter(concurrency=2, rate=None, total=8)
+        running = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+        b_started = []
+
+        async def job(origin):
+            async with limiter.slot(f"http://{origin}.test/login"):
+                running[origin] += 1
+                peak[origin] = max(peak[origin], running[origin])
+                if origin == "b":
+                    b_started.append(time.monotonic())
+                await asyncio.sleep(0.05)
+                running[origin] -= 1
+
+        started = time.monotonic()
+        await asyncio.gather(*[job("a") for _ in range(6)], *[job("b") for _ in range(2)])
+        return peak, max(b_started) - started
+
+    peak, b_wait = asyncio.run(main())
+    assert peak == {"a": 2, "b": 2}
+    assert b_wait < 0.04        # origin b did not queue behind origin a's backlog
+
+def test_total_cap():
+    async def main():
+        limiter = RateLimiter(concurrency=10, rate=None, total=3)
+        running = peak = 0
+
+        async def job(i):
+            nonlocal running, peak
+            async with limiter.slot(f"http://site{i}.test/"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.02)
+                running -= 1
+
+        await asyncio.gather(*(job(i) for i in range(9)))
+        return peak
+
+    assert asyncio.run(main()) == 3
+
+def test_token_bucket_rate():
+    async def main():
+        limiter = RateLimiter(concurrency=5, rate=20, burst=1)
+        started = time.monotonic()
+        for _ in range(5):
+            async with limiter.slot("http://a.test/"):
+                pass
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.18      # 1 token at once, then 4 more at 20/s
+
+def test_run_scheduled_retries_and_backs_off(monkeypatch):
+    monkeypatch.setattr(rate_limit, "BACKOFF_BASE", 0.01)
+    reports = [
+        {"outcome": "error", "error": "Timeout 10000ms exceeded"},
+        {"outcome": "failure", "http_429": 1},
+        {"outcome": "success"},
+    ]
+
+    async def main():
+        limiter = RateLimiter(concurrency=1, rate=4.0)
+
+        async def attempt():
+            report = reports.pop(0)
+            return report["outcome"] == "success", report
+
+        result = await run_scheduled(limiter, "http://a.test/", attempt, retries=2)
+        return result, limiter.for_url("http://a.test/").rate
+
+    (success, report, attempts), rate = asyncio.run(main())
+    assert success and attempts == 3
+    assert rate == 2.0 + rate_limit.RATE_STEP     # halved on the 429, regained a step on success
+
+def test_run_scheduled_stops_after_retries():
+    async def main():
+        calls = 0
+
+        async def attempt():
+            nonlocal calls
+            calls += 1
+            return False, {"outcome": "failure", "evidence": {"error": ["invalid"]}}
+
+        result = await run_scheduled(RateLimiter(rate=None), "http://a.test/", attempt, retries=3)
+        return result, calls
+
+    (success, _, attempts), calls = asyncio.run(main())
+    assert not success and attempts == 1 and calls == 1
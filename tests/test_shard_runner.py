@@ -0,0 +1,22 @@
+from shard_runner import plan_slots, split_limits
+
+def jobs_for(*urls):
+    return [{"url": url} for url in urls]
+
+def test_single_site_spans_shards():
+    pending, spans = plan_slots(jobs_for(*["https://a.test/login"] * 12), 4, 4)
+    assert [len(backlog) for backlog in pending] == [3, 3, 3, 3]
+    assert spans == {"https://a.test": 4}
+    assert split_limits(spans, 4, 2.0) == {"https://a.test": {"concurrency": 1, "rate": 0.5}}
+
+def test_largest_origin_onto_least_loaded_slots():
+    jobs = jobs_for(*["https://a.test/login"] * 6, *["https://b.test/login"] * 3, *["https://c.test/login"] * 3)
+    pending, spans = plan_slots(jobs, 4, 4)
+    assert sorted(len(backlog) for backlog in pending) == [3, 3, 3, 3]
+    assert spans == {"https://a.test": 2, "https://b.test": 1, "https://c.test": 1}
+    assert split_limits(spans, 4, None) == {"https://a.test": {"concurrency": 2, "rate": None}}
+
+def test_span_never_exceeds_per_origin():
+    pending, spans = plan_slots(jobs_for(*["https://a.test/login"] * 8), 8, 2)
+    assert spans == {"https://a.test": 2}
+    assert sum(1 for backlog in pending if backlog) == 2
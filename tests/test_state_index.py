@@ -0,0 +1,50 @@
+import os
+import sqlite3
+
+import state_index
+from state_index import STATE_DB_NAME, StateIndex
+
+URL = "http://portal.test/dashboard"
+
+def saved(tmp_path, name):
+    (tmp_path / name).write_text(name)
+    return {"sha256": "0" * 64, "size": len(name), "file": name}
+
+def test_concurrent_runs_are_not_resumed(tmp_path):
+    first = StateIndex(str(tmp_path), URL, "alice")
+    second = StateIndex(str(tmp_path), URL, "alice")
+    assert first.start_run() is None
+    assert second.start_run() is None
+    status = first.db.execute("SELECT finished_at FROM runs WHERE id = ?", (first.run_id,)).fetchone()
+    assert status == (None,)
+
+def test_dead_run_is_resumed(tmp_path, monkeypatch):
+    first = StateIndex(str(tmp_path), URL, "alice")
+    first.start_run()
+    monkeypatch.setattr(state_index, "_process_alive", lambda pid: False)
+    assert StateIndex(str(tmp_path), URL, "alice").start_run() is not None
+    status = first.db.execute("SELECT finished_at FROM runs WHERE id = ?", (first.run_id,)).fetchone()
+    assert status == ("interrupted",)
+
+def test_files_are_kept_per_account(tmp_path):
+    alice = StateIndex(str(tmp_path), URL, "alice")
+    alice.record("report.pdf", "fp", saved(tmp_path, "1_report.pdf"))
+    assert alice.is_unchanged("report.pdf", "fp")
+    assert not StateIndex(str(tmp_path), URL, "bob").is_unchanged("report.pdf", "fp")
+
+def test_index_from_before_accounts_is_upgraded(tmp_path):
+    db = sqlite3.connect(os.path.join(tmp_path, STATE_DB_NAME))
+    db.executescript("""
+        CREATE TABLE files (origin TEXT NOT NULL, name TEXT NOT NULL, fingerprint TEXT NOT NULL, sha256 TEXT,
+                            size INTEGER, saved_as TEXT, downloaded_at TEXT, PRIMARY KEY (origin, name));
+        CREATE TABLE runs (id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, started_at TEXT NOT NULL,
+                           finished_at TEXT, downloaded INTEGER DEFAULT 0, unchanged INTEGER DEFAULT 0,
+                           failed INTEGER DEFAULT 0);
+        INSERT INTO files VALUES ('http://portal.test', 'old.pdf', 'fp', NULL, 1, 'old.pdf', NULL);
+    """)
+    db.close()
+    (tmp_path / "old.pdf").write_text("old")
+    assert StateIndex(str(tmp_path), URL).is_unchanged("old.pdf", "fp")
+    index = StateIndex(str(tmp_path), URL, "alice")
+    assert index.start_run() is None
+    assert not index.is_unchanged("old.pdf", "fp")
@@ -0,0 +1,26 @@
+from table_scan import index_targets, match_row
+
+def row(*cells):
+    return {"cells": list(cells), "text": "\t".join(cells)}
+
+def test_exact_cell_and_word():
+    targets, by_length = index_targets(["Project_Report_2024.pdf", "Meeting_Notes.docx"])
+    assert match_row(row("Project_Report_2024.pdf", "2 MB"), targets, by_length) == "Project_Report_2024.pdf"
+    assert match_row(row("📄 Meeting_Notes.docx", "1 KB"), targets, by_length) == "Meeting_Notes.docx"
+    assert match_row(row("Other.pdf", "1 KB"), targets, by_length) is None
+
+def test_multi_word_file_name():
+    targets, by_length = index_targets(["Q3 report.pdf"])
+    assert match_row(row("📄 Q3 report.pdf", "2024-10-01", "Download"), targets, by_length) == "Q3 report.pdf"
+
+def test_partial_name_prefers_longest_target():
+    targets, by_length = index_targets(["report", "Q3 report.pdf"])
+    assert match_row(row("Q3 report.pdf (final)", "Download"), targets, by_length) == "Q3 report.pdf"
+    assert match_row(row("Annual report 2023.pdf"), targets, by_length) == "report"
+
+def test_found_names_leave_both_indexes():
+    targets, by_length = index_targets(["Q3 report.pdf", "report"])
+    assert by_length == ["Q3 report.pdf", "report"]
+    targets.discard("Q3 report.pdf")
+    by_length.remove("Q3 report.pdf")
+    assert match_row(row("Q3 report.pdf (final)"), targets, by_length) == "report"
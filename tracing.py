@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Per-phase timing for login and scrape runs
+A RunTrace records monotonic timings for each phase (navigation, field
+lookups, submit, 2FA, classification, each download...) plus bytes
+downloaded, peak memory and the outcome, and serializes to one JSON object
+per run.
+The active trace lives in a context variable, so site scripts and the
+download pipeline can add phases without being handed the trace. Live
+progress events (see login_stream.py) travel the same way: emit() hands
+them to the trace's listeners
+"""
+
+import os
+import json
+import time
+import contextlib
+import contextvars
+from datetime import datetime, timezone
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+class RunTrace:
+    """Timings and outcome of one login (+ site script) run"""
+
+    def __init__(self, kind="login", **fields):
+        self.kind = kind
+        self.fields = fields
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.start = time.monotonic()
+        self.end = None
+        self.phases = []
+        self.bytes_downloaded = 0
+        self.outcome = None
+        self.peak_rss = None        # whole process tree (shared by concurrent jobs), sampled at every phase end
+        self.peak_js_heap = None    # this run's page, sampled when its text is read
+        self.listeners = []         # fn(kind, data) for live events, see emit()
+
+    @contextlib.contextmanager
+    def phase(self, name, **attrs):
+        """Time the body of a `with` block as phase `name`; exceptions are recorded and re-raised"""
+        started = time.monotonic()
+        status = "ok"
+        try:
+            yield attrs
+        except BaseException as e:
+            status = f"error: {type(e).__name__}"
+            raise
+        finally:
+            self.record(name, time.monotonic() - started, started=started, status=status, **attrs)
+
+    def record(self, name, duration, started=None, **attrs):
+        """Add an already-measured phase (duration in seconds)"""
+        if started is None:
+            started = time.monotonic() - duration
+        self.sample_memory()
+        self.phases.append({
+            "phase": name,
+            "offset_ms": round((started - self.start) * 1000, 1),
+            "duration_ms": round(duration * 1000, 1),
+            **attrs,
+        })
+
+    def sample_memory(self, js_heap=None):
+        """Raise the peak memory figures to the current process tree RSS (and `js_heap` bytes)"""
+        rss = process_tree_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+        if js_heap:
+            self.peak_js_heap = max(self.peak_js_heap or 0, js_heap)
+
+    def finish(self, outcome, **fields):
+        self.outcome = outcome
+        self.fields.update(fields)
+        self.end = time.monotonic()
+
+    def to_dict(self):
+        end = self.end if self.end is not None else time.monotonic()
+        return {
+            "kind": self.kind,
+            **self.fields,
+            "started_at": self.started_at,
+            "outcome": self.outcome,
+            "duration_ms": round((end - self.start) * 1000, 1),
+            "bytes_downloaded": self.bytes_downloaded,
+            # Process-wide: includes the shared browser and every job running alongside
+            "process_peak_rss_mb": _mb(self.peak_rss),
+            "peak_js_heap_mb": _mb(self.peak_js_heap),
+            "phases": self.phases,
+        }
+
+def _mb(value):
+    return round(value / (1024 * 1024), 1) if value else None
+
+@contextlib.contextmanager
+def active_trace(trace):
+    """Make `trace` the current trace for the body (and any tasks it starts)"""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+def current_trace():
+    return _current_trace.get()
+
+def set_outcome(outcome, **fields):
+    """Record the run's outcome (and extra report fields) on the current trace, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.outcome = outcome
+        trace.fields.update(fields)
+
+@contextlib.contextmanager
+def trace_phase(name, **attrs):
+    """Time a phase on the current trace; a no-op when nothing is being traced"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield attrs
+    else:
+        with trace.phase(name, **attrs) as phase_attrs:
+            yield phase_attrs
+
+def trace_event(name, duration, **attrs):
+    """Record an already-measured phase on the current trace (if any)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(name, duration, **attrs)
+        if not attrs.get("skipped"):
+            trace.bytes_downloaded += attrs.get("bytes", 0)
+
+def emit(kind, **data):
+    """Publish a live progress event to the current trace's listeners, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        for listener in trace.listeners:
+            listener(kind, data)
+
+def note_js_heap(js_heap):
+    """Record a page's JS heap size (bytes) on the current trace, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.sample_memory(js_heap)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))    # ceil without floats
+    return ordered[int(rank) - 1]
+
+def summarize(reports):
+    """
+    Batch aggregates over run reports (dicts from RunTrace.to_dict):
+    counts per outcome and p50/p95/max per phase and for whole runs
+    """
+    outcomes = {}
+    by_phase = {}
+    for report in reports:
+        outcomes[report["outcome"]] = outcomes.get(report["outcome"], 0) + 1
+        for phase in report["phases"]:
+            by_phase.setdefault(phase["phase"], []).append(phase["duration_ms"])
+
+    def stats(values):
+        return {
+            "count": len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "max_ms": max(values) if values else None,
+        }
+
+    network = [r["network"] for r in reports if r.get("network")]
+    rss = [r["process_peak_rss_mb"] for r in reports if r.get("process_peak_rss_mb")]
+    js_heap = [r["peak_js_heap_mb"] for r in reports if r.get("peak_js_heap_mb")]
+
+    return {
+        "kind": "batch_summary",
+        "runs": len(reports),
+        "outcomes": outcomes,
+        "bytes_downloaded": sum(r["bytes_downloaded"] for r in reports),
+        "network": {
+            "blocked": sum(n["blocked"] for n in network),
+            "bytes_saved_estimate": sum(n["bytes_saved_estimate"] for n in network),
+        },
+        "memory": {
+            "peak_rss_mb": max(rss) if rss else None,
+            "js_heap_p95_mb": percentile(js_heap, 95),
+            "js_heap_max_mb": max(js_heap) if js_heap else None,
+        },
+        "run": stats([r["duration_ms"] for r in reports]),
+        "phases": {name: stats(values) for name, values in sorted(by_phase.items())},
+    }
+
+def child_pids(pid):
+    """PIDs whose parent is `pid` (Linux /proc; empty elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+def process_tree_rss(pid=None):
+    """
+    Resident memory in bytes of `pid` (default: this process) and all its
+    descendants - Playwright driver and Chromium included - or None if unknown
+    """
+    root = os.getpid() if pid is None else pid
+    total = 0
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            if current == root:
+                return None
+            continue
+        stack.extend(child_pids(current))
+    return total
+
+def write_jsonl(path, records):
+    """Append records to a JSONL report file"""
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+@contextlib.contextmanager
+def quiet_output(enabled=True):
+    """Silence the emoji progress prints (stdout) for the body, e.g. for --quiet"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+2FA code providers for login_tester.py
+A provider is anything with `async get_code(username, url)` returning the
+code (or None). None of them block the event loop, so many 2FA-protected
+accounts can log in concurrently; get_twofa_code() bounds the wait
+
+  prompt                ask on the terminal (the default; one prompt at a time, no code without a terminal)
+  totp:<secret>         RFC 6238 code from a base32 secret ("totp:$ENV_VAR" reads it from the environment)
+  file:<path>           wait for a code file to appear ({username} is substituted), consume it
+  none                  never a code: 2FA-protected logins fail at once (unattended services)
+  QueueProvider(q)      take codes from an asyncio.Queue
+  CallbackProvider(fn)  call fn(username, url), sync or async
+"""
+
+import os
+import sys
+import time
+import hmac
+import base64
+import struct
+import asyncio
+import hashlib
+import inspect
+import weakref
+
+DEFAULT_TWOFA_TIMEOUT = 120     # seconds to wait for a code before giving up
+TOTP_MIN_VALIDITY = 2           # seconds - closer to the window edge, wait for the next code
+
+def totp(secret, for_time=None, digits=6, period=30):
+    """RFC 6238 time-based one-time password (HMAC-SHA1) for a base32 secret"""
+    secret = secret.replace(" ", "").upper()
+    key = base64.b32decode(secret + "=" * (-len(secret) % 8))
+    counter = int((time.time() if for_time is None else for_time) // period)
+    digest = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    code = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(code % 10 ** digits).zfill(digits)
+
+# Concurrent jobs would interleave their prompts - ask one at a time (per event loop)
+_prompt_locks = weakref.WeakKeyDictionary()
+
+def _prompt_lock():
+    loop = asyncio.get_running_loop()
+    if loop not in _prompt_locks:
+        _prompt_locks[loop] = asyncio.Lock()
+    return _prompt_locks[loop]
+
+async def _read_line(stream):
+    """
+    One line from a terminal without a thread: the read is a loop reader, so
+    cancelling (a 2FA timeout) really stops it and frees the prompt
+    """
+    loop = asyncio.get_running_loop()
+    fd = stream.fileno()
+    line = loop.create_future()
+    chunks = []
+
+    def on_readable():
+        data = os.read(fd, 1024)
+        chunks.append(data)
+        if (not data or b"\n" in data) and not line.done():
+            line.set_result(b"".join(chunks).decode(errors="replace"))
+
+    try:
+        loop.add_reader(fd, on_readable)
+    except NotImplementedError:
+        # Event loops without add_reader (Windows proactor): a thread it is -
+        # a timed-out read then lingers until a line is entered
+        return await asyncio.to_thread(stream.readline)
+    try:
+        return await line
+    finally:
+        loop.remove_reader(fd)
+
+class PromptProvider:
+    """
+    Ask on the terminal without blocking the event loop
+    Returns None at once when there is no one to ask: stdin is not a
+    terminal, or progress output is hidden (--quiet, shard workers...)
+    """
+
+    async def get_code(self, username, url):
+        if not (sys.stdin.isatty() and sys.stdout.isatty()):
+            print("❌ 2FA code needed but there is no terminal to ask on - use a totp:/file: provider")
+            return None
+        async with _prompt_lock():
+            print("📱 Please check your phone/authenticator app for the code")
+            print(f"\n🔢 Enter the 2FA code for {username}: ", end="", flush=True)
+            code = await _read_line(sys.stdin)
+        return code.strip() or None
+
+class TOTPProvider:
+    """Generate the current TOTP code from a stored base32 secret"""
+
+    def __init__(self, secret, digits=6, period=30):
+        self.secret = secret
+        self.digits = digits
+        self.period = period
+
+    async def get_code(self, username, url):
+        remaining = self.period - time.time() % self.period
+        if remaining < TOTP_MIN_VALIDITY:
+            # The code would likely expire before the form is submitted
+            await asyncio.sleep(remaining)
+        return totp(self.secret, digits=self.digits, period=self.period)
+
+class CodeFileProvider:
+    """
+    Wait for a file holding the code (written by an SMS/email bridge, a
+    person, another process...), then delete it so it is used only once
+    """
+
+    def __init__(self, path, poll_interval=0.5):
+        self.path = path
+        self.poll_interval = poll_interval
+
+    async def get_code(self, username, url):
+        path = self.path.format(username=username)
+        print(f"📂 Waiting for a 2FA code in {path}...")
+        while True:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    code = f.read().strip()
+            except FileNotFoundError:
+                code = None
+            if code:
+                os.remove(path)
+                return code
+            await asyncio.sleep(self.poll_interval)
+
+class QueueProvider:
+    """Take the next code from an asyncio.Queue (fed by a bot, webhook, test...)"""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    async def get_code(self, username, url):
+        return await self.queue.get()
+
+class NoCodeProvider:
+    """Never has a code - for callers with no one to ask and no secret to use"""
+
+    async def get_code(self, username, url):
+        print("❌ 2FA code needed but this run has no 2FA provider")
+        return None
+
+class CallbackProvider:
+    """Call `fn(username, url)`; a plain function runs in a worker thread"""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    async def get_code(self, username, url):
+        if inspect.iscoroutinefunction(self.fn):
+            return await self.fn(username, url)
+        return await asyncio.to_thread(self.fn, username, url)
+
+def make_provider(spec=None):
+    """
+    Provider for a spec string ("prompt", "totp:<secret>", "file:<path>",
+    "none"), an existing provider, or a callable (wrapped in CallbackProvider)
+    """
+    if spec is None or spec == "prompt":
+        return PromptProvider()
+    if spec == "none":
+        return NoCodeProvider()
+    if hasattr(spec, "get_code"):
+        return spec
+    if callable(spec):
+        return CallbackProvider(spec)
+
+    kind, _, value = spec.partition(":")
+    if kind == "totp" and value:
+        if value.startswith("$"):
+            value = os.environ.get(value[1:], "")
+            if not value:
+                raise ValueError(f"2FA secret variable {spec[5:]} is not set")
+        return TOTPProvider(value)
+    if kind == "file" and value:
+        return CodeFileProvider(value)
+    raise ValueError(f"Unknown 2FA provider '{spec}' - use prompt, totp:<secret>, file:<path> or none")
+
+async def get_twofa_code(provider, username, url, timeout=DEFAULT_TWOFA_TIMEOUT):
+    """The provider's code, or None if it has none within `timeout` seconds"""
+    try:
+        code = await asyncio.wait_for(provider.get_code(username, url), timeout)
+    except asyncio.TimeoutError:
+        print(f"⏰ No 2FA code within {timeout}s")
+        return None
+    return str(code).strip() if code else None
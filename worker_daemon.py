@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Long-running worker for login_tester.py
+Keeps a pool of pre-launched Chromium browsers and accepts login/scrape jobs
+over a local HTTP endpoint, so Python, the Playwright driver and Chromium
+start once per worker instead of once per check. Browsers are recycled after
+N jobs or when their processes grow past a memory threshold; a relaunch that
+fails is retried in the background with backoff while the other browsers
+keep serving
+
+Usage: python worker_daemon.py [--port 8777] [--browsers 2] [--profile fast]
+                               [--max-jobs 50] [--max-rss-mb 1500] [--site-scripts a.py,b.py]
+
+  POST /jobs    {"username", "password", "url", "site_script", "twofa"} -> result JSON
+  GET  /health  pool, queue depth and job counters
+
+Every request needs "Authorization: Bearer <token>" (printed at start, or
+set with $WORKER_DAEMON_TOKEN) and POST /jobs a JSON content type; requests
+carrying an Origin header (i.e. from a web page) are refused. Jobs can only
+name site scripts loaded with --site-scripts (by file name without .py),
+and only literal totp:<secret> 2FA specs; a job without one gets no 2FA code
+(nothing ever prompts on the daemon's terminal)
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import asyncio
+import secrets
+from playwright.async_api import async_playwright
+
+from login_tester import test_login, pop_option
+from profiles import PROFILES, get_profile, launch_options
+from tracing import RunTrace, child_pids, process_tree_rss
+from plugins import REGISTRY, register_plugin_file
+
+DEFAULT_PORT = 8777
+DEFAULT_BROWSERS = 2
+DEFAULT_MAX_JOBS = 50           # recycle a browser after this many jobs
+DEFAULT_MAX_RSS_MB = 1500       # ...or when its process tree uses this much memory
+MAX_BODY_BYTES = 1024 * 1024
+TOKEN_ENV = "WORKER_DAEMON_TOKEN"
+RELAUNCH_BACKOFF = 1.0          # seconds before retrying a failed relaunch, doubled per failure
+RELAUNCH_BACKOFF_MAX = 60.0
+
+def validate_job(job):
+    """
+    Reject job fields a client must not control: site scripts other than the
+    ones loaded at start, and 2FA specs that read local files or the
+    daemon's environment. Raises ValueError
+    """
+    if not isinstance(job, dict) or not job.get("username") or job.get("password") is None:
+        raise ValueError("job needs username and password")
+    site_script = job.get("site_script")
+    if site_script is not None and site_script not in REGISTRY:
+        raise ValueError(f"unknown site script '{site_script}' - the daemon serves: {', '.join(REGISTRY) or 'none'}")
+    twofa = job.get("twofa")
+    if twofa is not None:
+        kind, _, value = str(twofa).partition(":")
+        if kind != "totp" or not value or value.startswith("$"):
+            raise ValueError("twofa must be a literal totp:<secret>")
+
+def _browser_pids():
+    """Chromium main processes: children of the Playwright driver(s) we started"""
+    return {pid for driver in child_pids(os.getpid()) for pid in child_pids(driver)}
+
+class PooledBrowser:
+    """One warm browser plus the counters used to decide when to recycle it"""
+
+    def __init__(self, browser, pid):
+        self.browser = browser
+        self.pid = pid
+        self.jobs = 0
+        self.launched_at = time.monotonic()
+
+    def rss_bytes(self):
+        return process_tree_rss(self.pid) if self.pid else None
+
+class BrowserPool:
+    """Fixed-size pool of launched browsers with recycling"""
+
+    def __init__(self, playwright, profile, size, max_jobs, max_rss_mb):
+        self.playwright = playwright
+        self.profile = profile
+        self.size = size
+        self.live = 0               # launched browsers, idle or busy
+        self.max_jobs = max_jobs
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.idle = asyncio.Queue()
+        self.recycled = 0
+        self.launch_failures = 0
+        self._launch_lock = asyncio.Lock()
+        self._relaunching = set()
+
+    async def _launch(self):
+        # Playwright doesn't expose the browser PID; launches are serialized so
+        # the new Chromium is the one browser process that wasn't there before
+        async with self._launch_lock:
+            before = _browser_pids()
+            browser = await self.playwright.chromium.launch(**launch_options(self.profile))
+            new_pids = _browser_pids() - before
+        return PooledBrowser(browser, new_pids.pop() if len(new_pids) == 1 else None)
+
+    async def start(self):
+        for _ in range(self.size):
+            self.idle.put_nowait(await self._launch())
+            self.live += 1
+
+    async def acquire(self):
+        return await self.idle.get()
+
+    async def release(self, pooled):
+        """Return a browser to the pool, relaunching it first if it is due for recycling"""
+        pooled.jobs += 1
+        rss = pooled.rss_bytes()
+        reason = None
+        if pooled.jobs >= self.max_jobs:
+            reason = f"{pooled.jobs} jobs"
+        elif rss is not None and rss > self.max_rss:
+            reason = f"{rss // (1024 * 1024)} MB RSS"
+        elif not pooled.browser.is_connected():
+            reason = "disconnected"
+
+        if not reason:
+            self.idle.put_nowait(pooled)
+            return
+
+        print(f"♻️  Recycling browser ({reason})")
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+        self.recycled += 1
+        self.live -= 1
+        task = asyncio.create_task(self._relaunch())
+        self._relaunching.add(task)
+        task.add_done_callback(self._relaunching.discard)
+
+    async def _relaunch(self):
+        """Launch a replacement browser, retrying with backoff until one starts"""
+        failures = 0
+        while True:
+            try:
+                pooled = await self._launch()
+            except Exception as e:
+                failures += 1
+                self.launch_failures += 1
+                delay = min(RELAUNCH_BACKOFF_MAX, RELAUNCH_BACKOFF * 2 ** (failures - 1))
+                print(f"❌ Browser relaunch failed ({str(e)}) - {self.live}/{self.size} browsers up, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                continue
+            self.live += 1
+            self.idle.put_nowait(pooled)
+            return
+
+    async def close(self):
+        for task in self._relaunching:
+            task.cancel()
+        await asyncio.gather(*self._relaunching, return_exceptions=True)
+        while not self.idle.empty():
+            await self.idle.get_nowait().browser.close()
+
+class WorkerDaemon:
+    """Job queue + HTTP front end over a BrowserPool"""
+
+    def __init__(self, pool, profile, token):
+        self.pool = pool
+        self.profile = profile
+        self.token = token
+        self.queue = asyncio.Queue()
+        self.started = time.monotonic()
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def run_worker(self):
+        while True:
+            job, future = await self.queue.get()
+            pooled = await self.pool.acquire()
+            self.busy += 1
+            try:
+                result = await self.run_job(pooled.browser, job)
+                if not result["success"]:
+                    self.failed += 1
+                if not future.cancelled():
+                    future.set_result(result)
+            except Exception as e:
+                self.failed += 1
+                if not future.cancelled():
+                    future.set_result({"success": False, "error": str(e)})
+            finally:
+                self.busy -= 1
+                self.completed += 1
+                await self.pool.release(pooled)
+
+    async def run_job(self, browser, job):
+        trace = RunTrace(kind="login")
+        success = await test_login(
+            job["username"], job["password"], job.get("url"), job.get("site_script"),
+            browser=browser, profile=self.profile, session_cache=bool(job.get("session_cache")),
+            trace=trace, twofa=job.get("twofa") or "none",
+        )
+        return {"success": success, "report": trace.to_dict()}
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "profile": self.profile["name"],
+            "browsers": self.pool.live,
+            "browsers_configured": self.pool.size,
+            "browsers_idle": self.pool.idle.qsize(),
+            "launch_failures": self.pool.launch_failures,
+            "busy": self.busy,
+            "queue_depth": self.queue.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "recycled": self.pool.recycled,
+        }
+
+    async def handle_connection(self, reader, writer):
+        try:
+            status, payload = await self.handle_request(reader)
+        except Exception as e:
+            status, payload = 400, {"error": str(e)}
+
+        body = json.dumps(payload).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+                  415: "Unsupported Media Type"}.get(status, "Error")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise ValueError("malformed request line")
+        method, path = request_line[0], request_line[1]
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        # Browsers always send Origin on cross-site POSTs (and fetch/XHR) - no web page gets in
+        if "origin" in headers:
+            return 403, {"error": "cross-origin requests are not accepted"}
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip(), self.token):
+            return 401, {"error": "missing or wrong bearer token"}
+
+        if method == "GET" and path == "/health":
+            return 200, self.health()
+
+        if method == "POST" and path == "/jobs":
+            if headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+                return 415, {"error": "POST /jobs needs Content-Type: application/json"}
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                raise ValueError("request body too large")
+            job = json.loads(await reader.readexactly(length))
+            validate_job(job)
+
+            future = asyncio.get_running_loop().create_future()
+            await self.queue.put((job, future))
+            return 200, await future
+
+        return 404, {"error": f"no route for {method} {path}"}
+
+async def serve(port, browsers, profile, max_jobs, max_rss_mb, token):
+    """Launch the pool and serve jobs (authenticated with `token`) until interrupted"""
+    profile = get_profile(profile)
+    async with async_playwright() as p:
+        pool = BrowserPool(p, profile, browsers, max_jobs, max_rss_mb)
+        print(f"🔥 Launching {browsers} warm browsers ({profile['name']} profile)...")
+        await pool.start()
+
+        daemon = WorkerDaemon(pool, profile, token)
+        # One worker per browser: jobs beyond that wait in the queue (and show in /health)
+        workers = [asyncio.create_task(daemon.run_worker()) for _ in range(browsers)]
+        server = await asyncio.start_server(daemon.handle_connection, "127.0.0.1", port)
+        print(f"🚀 Worker listening on http://127.0.0.1:{port} (POST /jobs, GET /health)")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await pool.close()
+
+def main():
+    """Main function to handle command line arguments"""
+    argv = sys.argv[1:]
+    port = int(pop_option(argv, "--port", DEFAULT_PORT))
+    browsers = int(pop_option(argv, "--browsers", DEFAULT_BROWSERS))
+    profile = pop_option(argv, "--profile", "fast")
+    max_jobs = int(pop_option(argv, "--max-jobs", DEFAULT_MAX_JOBS))
+    max_rss_mb = int(pop_option(argv, "--max-rss-mb", DEFAULT_MAX_RSS_MB))
+    site_scripts = pop_option(argv, "--site-scripts")
+
+    if argv or profile not in PROFILES:
+        print(__doc__.strip().split("\n\n", 1)[1])
+        sys.exit(1)
+
+    for path in filter(None, (site_scripts or "").split(",")):
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            register_plugin_file(name, path)
+        except Exception as e:
+            print(f"❌ Error loading site script {path}: {str(e)}")
+            sys.exit(1)
+        print(f"🧩 Site script '{name}' available to jobs")
+
+    token = os.environ.get(TOKEN_ENV)
+    if not token:
+        token = secrets.token_urlsafe(24)
+        print(f"🔑 Bearer token for this run: {token}  (set ${TOKEN_ENV} to choose one)")
+
+    try:
+        asyncio.run(serve(port, browsers, profile, max_jobs, max_rss_mb, token))
+    except KeyboardInterrupt:
+        print("\n🔚 Worker stopped")
+
+if __name__ == "__main__":
+    main()